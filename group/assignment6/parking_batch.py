@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Solves many independent rearrangement problems over a pool of processes.
+
+A problem is a tuple (start, target, constraints) as taken by ParkingLot and
+ParkingLot.get_moves. The problems are split into chunks, each chunk is
+solved by a worker process, and the results are returned in input order.
+A problem that fails or runs out of time is reported in its result and does
+not affect the other problems.
+
+The exhaustive search of all the paths of a single problem is parallelized
+the same way: it is cut at a frontier of prefixes (see
+ParkingLot.get_path_prefixes), and the paths below each prefix are found by
+a worker process.
+"""
+
+import concurrent.futures
+import os
+import signal
+from typing import (List, Set, Dict, NamedTuple, Optional, Sequence, Tuple,
+                    Iterator)
+
+from parking_lot import ParkingLot
+from parking_state import CarType, MoveType
+
+ProblemType = Tuple[List[CarType], List[CarType],
+                    Optional[Dict[int, Set[CarType]]]]
+ResultType = NamedTuple("ResultType",
+                        [("moves", Optional[List[MoveType]]),
+                         ("error", Optional[str])])
+
+
+class ProblemTimeout(Exception):
+    """Raised in a worker when a problem exceeds its time limit."""
+
+
+def solve_many(problems: Sequence[ProblemType], workers: int = None,
+               empty: CarType = 0, mode: str = None, timeout: float = None,
+               chunk_size: int = None) -> List[ResultType]:
+    """Computes the moves for each problem (see ParkingLot.get_moves).
+
+    Args:
+        problems: A sequence of (start, target, constraints) tuples.
+        workers: Number of worker processes, os.cpu_count() by default.
+        empty: Object representing the empty slot in all the problems.
+        mode: Search mode (see ParkingLot.get_moves).
+        timeout: Time limit in seconds for each problem, no limit if None.
+        It relies on SIGALRM, so it is only available on Unix.
+        chunk_size: Number of problems sent to a worker at a time, by default
+        the problems are split into four chunks per worker.
+
+    Returns:
+        A list of (moves, error) results in the order of the problems, where
+        moves are as returned by ParkingLot.get_moves if error is None, and
+        error describes the failure otherwise.
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, len(problems) // (4 * workers))
+    chunks = [problems[index:index + chunk_size]
+              for index in range(0, len(problems), chunk_size)]
+
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(solve_chunk, chunk, empty, mode, timeout)
+                   for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            try:
+                results.extend(future.result())
+            except Exception as error:  # e.g. a worker process was killed
+                results.extend([ResultType(None, describe_error(error))]
+                               * len(chunk))
+    return results
+
+
+def get_all_paths(start: List[CarType], target: List[CarType],
+                  constraints: Dict[int, Set[CarType]] = None,
+                  empty: CarType = 0, workers: int = None,
+                  frontier_length: int = 2, chunk_size: int = None) \
+        -> List[List[MoveType]]:
+    """Computes the paths of ParkingLot.get_all_paths over worker processes.
+
+    Args:
+        start, target, constraints, empty: The problem (see ParkingLot).
+        workers, frontier_length, chunk_size: See generate_all_paths.
+
+    Returns:
+        The paths of ParkingLot(start, empty, constraints).get_all_paths(
+        target), sorted by length (shortest first).
+    """
+    return sorted(generate_all_paths(start, target, constraints, empty,
+                                     workers, frontier_length, chunk_size),
+                  key=len)
+
+
+def generate_all_paths(start: List[CarType], target: List[CarType],
+                       constraints: Dict[int, Set[CarType]] = None,
+                       empty: CarType = 0, workers: int = None,
+                       frontier_length: int = 2, chunk_size: int = None) \
+        -> Iterator[List[MoveType]]:
+    """Generates all the paths from start to target over worker processes.
+
+    The prefixes of frontier_length moves are found first, then the paths
+    starting with each chunk of prefixes are searched by a worker. Each
+    chunk of paths is generated once it and the chunks before it are done,
+    so the paths come in the order of the sequential search.
+
+    Args:
+        start, target, constraints, empty: The problem (see ParkingLot).
+        workers: Number of worker processes, os.cpu_count() by default.
+        frontier_length: Number of moves of the prefixes, more prefixes
+        balance the work better but are searched more than once.
+        chunk_size: Number of prefixes sent to a worker at a time, by
+        default the prefixes are split into four chunks per worker.
+
+    Yields:
+        List of car moves (car, position), in the order of
+        ParkingState.generate_all_paths.
+    """
+    workers = workers or os.cpu_count() or 1
+    prefixes = ParkingLot(start.copy(), empty, constraints) \
+        .get_path_prefixes(target, frontier_length)
+    if chunk_size is None:
+        chunk_size = max(1, len(prefixes) // (4 * workers))
+    chunks = [prefixes[index:index + chunk_size]
+              for index in range(0, len(prefixes), chunk_size)]
+
+    executor = concurrent.futures.ProcessPoolExecutor(workers)
+    try:
+        futures = [executor.submit(_extend_chunk, start, target, constraints,
+                                   empty, chunk)
+                   for chunk in chunks]
+        for future in futures:
+            yield from future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _extend_chunk(start: List[CarType], target: List[CarType],
+                  constraints: Optional[Dict[int, Set[CarType]]],
+                  empty: CarType, chunk: Sequence[List[MoveType]]) \
+        -> List[List[MoveType]]:
+    """Finds the paths starting with the prefixes of a chunk in a worker."""
+    parking_lot = ParkingLot(start, empty, constraints)
+    return [path for prefix in chunk
+            for path in parking_lot.get_paths_with_prefix(target, prefix)]
+
+
+def solve_chunk(chunk: Sequence[ProblemType], empty: CarType, mode: str,
+                timeout: Optional[float]) -> List[ResultType]:
+    """Solves the problems of a chunk one after another in a worker process.
+
+    Args:
+        chunk: A sequence of (start, target, constraints) tuples.
+        empty, mode, timeout: As taken by solve_many. The timeout installs a
+        SIGALRM handler, so the chunk must run in the main thread of its
+        process.
+
+    Returns:
+        A list of (moves, error) results in the order of the problems.
+    """
+    if timeout is not None:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+    return [_solve(problem, empty, mode, timeout) for problem in chunk]
+
+
+def _solve(problem: ProblemType, empty: CarType, mode: str,
+           timeout: Optional[float]) -> ResultType:
+    """Solves a single problem, reporting rather than raising any error."""
+    if timeout is not None:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        start, target, constraints = problem
+        parking_lot = ParkingLot(start, empty, constraints)
+        return ResultType(parking_lot.get_moves(target, mode=mode), None)
+    except Exception as error:
+        return ResultType(None, describe_error(error))
+    finally:
+        if timeout is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _raise_timeout(signum, frame):
+    """Interrupts the current problem (SIGALRM handler)."""
+    raise ProblemTimeout("Time limit exceeded.")
+
+
+def describe_error(error: Exception) -> str:
+    """Returns a picklable description of the error, as put in the results."""
+    return f"{type(error).__name__}: {error}"
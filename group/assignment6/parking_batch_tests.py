@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+import random
+import unittest
+from parking_batch import solve_many, get_all_paths, generate_all_paths
+from parking_lot import ParkingLot
+
+
+class SolveManyTest(unittest.TestCase):
+    def test_results_in_input_order(self):
+        random.seed(8)
+        problems = []
+        for size in range(1, 30):
+            start = list(range(size))
+            target = start.copy()
+            random.shuffle(target)
+            problems.append((start, target, None))
+        results = solve_many(problems, workers=2, chunk_size=3)
+        self.assertEqual(len(results), len(problems))
+        for (start, target, _), result in zip(problems, results):
+            self.assertIsNone(result.error)
+            self.assertListEqual(result.moves,
+                                 ParkingLot(start.copy()).get_moves(target))
+
+    def test_errors_are_reported(self):
+        problems = [([1, 2, 0], [2, 1, 0], None),
+                    ([1, 2, 0], [2, 5, 0], None),
+                    ([1, 2, 0, 3], [2, 3, 0, 1], {2: {3}})]
+        results = solve_many(problems, workers=2)
+        self.assertListEqual(results[0].moves, [(1, 2), (2, 0), (1, 1)])
+        self.assertIsNone(results[1].moves)
+        self.assertTrue(results[1].error.startswith("ValueError"))
+        self.assertListEqual(results[2].moves,
+                             [(3, 2), (1, 3), (2, 0), (3, 1)])
+
+    def test_timeout_is_reported(self):
+        start = list(range(300000))
+        target = start[::-1]
+        results = solve_many([(start, target, None), ([0, 1], [1, 0], None)],
+                             workers=1, timeout=0.01)
+        self.assertIsNone(results[0].moves)
+        self.assertTrue(results[0].error.startswith("ProblemTimeout"))
+        self.assertListEqual(results[1].moves, [(1, 0)])
+
+
+class AllPathsTest(unittest.TestCase):
+    def test_same_as_sequential(self):
+        for start, target, constraints in (
+                ([1, 2, 0, 3], [3, 0, 2, 1], {0: {3, 2}}),
+                (["a", "b", "", "c"], ["b", "a", "", "c"], None),
+                ([0, 1, 2], [0, 1, 2], None)):
+            parking_lot = ParkingLot(start.copy(), start[2], constraints)
+            paths = list(generate_all_paths(start, target, constraints,
+                                            start[2], workers=2,
+                                            chunk_size=1))
+            self.assertListEqual(paths,
+                                 list(parking_lot.get_path_trie(target)))
+            self.assertListEqual(
+                get_all_paths(start, target, constraints, start[2], workers=2,
+                              frontier_length=3),
+                parking_lot.get_all_paths(target))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks the parking lot planners on seeded random instances.
+
+For each lot size N and constraint density, a random start state, target
+state and set of constraints are generated from the seed. Each planner
+(ParkingLot.get_moves in every applicable search mode, and a capped
+ParkingLot.iter_all_paths) is timed on that instance. The measurements are
+written to a JSON file, one record per (size, density, planner), in a stable
+order, so that the files of two commits can be compared:
+
+    python parking_benchmark.py --output before.json
+    python parking_benchmark.py --output after.json
+    python parking_benchmark.py --compare before.json after.json
+"""
+
+import argparse
+import copy
+import json
+import platform
+import random
+import signal
+import subprocess
+import time
+import tracemalloc
+from typing import List, Set, Dict, Optional, Tuple, Callable
+
+from parking_lot import ParkingLot
+from parking_state import SearchStats, CarType
+
+SIZES = (3, 5, 8, 12, 16, 20, 100, 1000, 10 ** 4, 10 ** 5, 10 ** 6)
+DENSITIES = (0.0, 0.2, 0.4, 0.8)
+SEARCH_MODES = ("dfs", "astar", "idastar", "bidirectional")
+
+
+class CaseTimeout(Exception):
+    """Raised when a planner exceeds the time limit of a case."""
+
+
+def generate_instance(size: int, density: float, seed: int) \
+        -> Tuple[List[int], List[int], Optional[Dict[int, Set[int]]]]:
+    """Generates a random start state, target state and constraints.
+
+    A constrained slot allows the cars that park there in the start and the
+    target states, and two other random cars, so that the target state does
+    not contradict the constraints.
+
+    Args:
+        size: Number of slots, the empty slot is 0.
+        density: Fraction of the slots that are constrained.
+        seed: Seed of the random generator, with size and density.
+
+    Returns:
+        The start state, the target state and the constraints (None if the
+        density is 0).
+    """
+    generator = random.Random(f"{seed}-{size}-{density}")
+    start = list(range(size))
+    target = start.copy()
+    generator.shuffle(start)
+    generator.shuffle(target)
+    if density == 0:
+        return start, target, None
+    constraints = {}
+    for position in generator.sample(range(size), round(density * size)):
+        constraints[position] = {start[position], target[position],
+                                 generator.randrange(size),
+                                 generator.randrange(size)}
+    return start, target, constraints
+
+
+def get_planners(constraints: Optional[Dict[int, Set[int]]], size: int,
+                 max_search_size: int, max_paths: int) \
+        -> List[Tuple[str, Callable[[ParkingLot, List[int], SearchStats],
+                                    int]]]:
+    """Returns the planners applicable to an instance.
+
+    The searches are only run up to max_search_size slots, the linear-time
+    "cycles" mode is run on every unconstrained lot.
+
+    Returns:
+        A list of (name, planner) pairs, where a planner takes the lot, the
+        target state and the statistics to collect, and returns the number
+        of moves (or paths) found.
+    """
+    planners = []
+    if constraints is None:
+        planners.append(("get_moves[cycles]", _get_moves("cycles")))
+    if size <= max_search_size:
+        planners.extend((f"get_moves[{mode}]", _get_moves(mode))
+                        for mode in SEARCH_MODES)
+        planners.append((f"iter_all_paths[{max_paths}]",
+                         _iter_all_paths(max_paths)))
+    return planners
+
+
+def _get_moves(mode: str) \
+        -> Callable[[ParkingLot, List[int], SearchStats], int]:
+    """Returns a planner running ParkingLot.get_moves in the mode."""
+    def planner(parking_lot: ParkingLot, target: List[int],
+                stats: SearchStats) -> int:
+        moves = parking_lot.get_moves(target, retain_state=True, mode=mode,
+                                      stats=stats)
+        return -1 if moves is None else len(moves)
+    return planner
+
+
+def _iter_all_paths(max_paths: int) \
+        -> Callable[[ParkingLot, List[int], SearchStats], int]:
+    """Returns a planner taking the first max_paths paths, shortest first."""
+    def planner(parking_lot: ParkingLot, target: List[int],
+                stats: SearchStats) -> int:
+        return sum(1 for _ in parking_lot.iter_all_paths(target, max_paths,
+                                                         stats=stats))
+    return planner
+
+
+def measure(planner: Callable[[ParkingLot, List[int], SearchStats], int],
+            start: List[CarType], target: List[CarType],
+            constraints: Optional[Dict[int, Set[CarType]]],
+            time_limit: float) -> Dict:
+    """Times a planner and then measures its peak memory in a second run.
+
+    Each run builds its own lot, which is part of the measurement. The
+    memory is measured separately, as tracing slows the planner down.
+
+    Returns:
+        The record of the measurement: status ("ok", "timeout" or the
+        error), seconds, peak_bytes, expanded (number of expanded states, see
+        SearchStats) and result (number of moves or paths, -1 if there is no
+        solution).
+    """
+    record = {"status": "ok", "seconds": None, "peak_bytes": None,
+              "expanded": None, "result": None}
+    try:
+        with _time_limit(time_limit):
+            stats = SearchStats()
+            began = time.perf_counter()
+            record["result"] = planner(
+                ParkingLot(start.copy(), 0, copy.deepcopy(constraints)),
+                target, stats)
+            record["seconds"] = time.perf_counter() - began
+            record["expanded"] = stats.expanded
+        tracemalloc.start()
+        try:
+            with _time_limit(time_limit):
+                planner(ParkingLot(start.copy(), 0,
+                                   copy.deepcopy(constraints)),
+                        target, None)
+            record["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    except CaseTimeout:
+        record["status"] = "timeout"
+    except Exception as error:
+        record["status"] = f"{type(error).__name__}: {error}"
+    return record
+
+
+class _time_limit:
+    """Raises CaseTimeout in the block after the given seconds (SIGALRM)."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def __enter__(self):
+        signal.signal(signal.SIGALRM, self._raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, self.seconds)
+
+    def __exit__(self, *exc_info):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+    @staticmethod
+    def _raise_timeout(signum, frame):
+        raise CaseTimeout()
+
+
+def run(sizes=SIZES, densities=DENSITIES, seed: int = 0,
+        max_search_size: int = 12, max_paths: int = 100,
+        time_limit: float = 120.0, verbose: bool = False) -> Dict:
+    """Runs the benchmark suite.
+
+    Returns:
+        A dictionary with the "settings" of the run, the "environment" it
+        ran in, and the list of "results" records.
+    """
+    results = []
+    for size in sizes:
+        for density in densities:
+            if density > 0 and size > max_search_size:
+                continue  # only the searches support constraints
+            start, target, constraints = generate_instance(size, density,
+                                                           seed)
+            for name, planner in get_planners(constraints, size,
+                                              max_search_size, max_paths):
+                record = {"size": size, "density": density, "planner": name}
+                record.update(measure(planner, start, target, constraints,
+                                      time_limit))
+                results.append(record)
+                if verbose:
+                    print(_format_record(record), flush=True)
+    return {"settings": {"sizes": list(sizes), "densities": list(densities),
+                         "seed": seed, "max_search_size": max_search_size,
+                         "max_paths": max_paths, "time_limit": time_limit},
+            "environment": _describe_environment(),
+            "results": results}
+
+
+def compare(before: Dict, after: Dict, threshold: float = 1.2) -> List[str]:
+    """Compares the results of two runs of the same settings.
+
+    Returns:
+        The lines describing the records whose time, memory or number of
+        expanded states grew by more than the threshold factor, or whose
+        result changed.
+    """
+    previous = {_record_key(record): record for record in before["results"]}
+    regressions = []
+    for record in after["results"]:
+        old = previous.get(_record_key(record))
+        if old is None:
+            continue
+        name = "{planner} N={size} density={density}".format(**record)
+        if old["status"] != record["status"] or \
+                old["result"] != record["result"]:
+            regressions.append(f"{name}: {old['status']}/{old['result']} -> "
+                               f"{record['status']}/{record['result']}")
+            continue
+        for metric in ("seconds", "peak_bytes", "expanded"):
+            if old[metric] and record[metric] and \
+                    record[metric] > threshold * old[metric]:
+                regressions.append(f"{name}: {metric} {old[metric]:.4g} -> "
+                                   f"{record[metric]:.4g}")
+    return regressions
+
+
+def _record_key(record: Dict) -> Tuple:
+    return record["size"], record["density"], record["planner"]
+
+
+def _format_record(record: Dict) -> str:
+    seconds = record["seconds"]
+    return ("{planner:>22} N={size:<8} density={density:<4} ".format(**record)
+            + (f"{seconds:10.4f}s" if seconds is not None else " " * 11)
+            + f" peak={record['peak_bytes']} expanded={record['expanded']}"
+            + f" result={record['result']}"
+            + ("" if record["status"] == "ok" else f" [{record['status']}]"))
+
+
+def _describe_environment() -> Dict:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "HEAD"],
+                                  capture_output=True, text=True,
+                                  check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {"revision": revision, "python": platform.python_version(),
+            "machine": platform.machine(), "platform": platform.platform()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--output", default="bench_output.json",
+                        help="JSON file to write the results to")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--densities", type=float, nargs="+",
+                        default=DENSITIES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-search-size", type=int, default=12,
+                        help="largest lot to run the searches on")
+    parser.add_argument("--max-paths", type=int, default=100,
+                        help="number of paths taken from iter_all_paths")
+    parser.add_argument("--time-limit", type=float, default=120.0,
+                        help="seconds per planner and instance")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown factor reported as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            regressions = compare(json.load(before), json.load(after),
+                                  args.threshold)
+        print("\n".join(regressions) or "No regressions.")
+        raise SystemExit(1 if regressions else 0)
+
+    report = run(args.sizes, args.densities, args.seed, args.max_search_size,
+                 args.max_paths, args.time_limit, verbose=True)
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=1)
+
+
+if __name__ == "__main__":
+    main()
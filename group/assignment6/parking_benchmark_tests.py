@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+import unittest
+from parking_benchmark import generate_instance, run, compare
+from parking_lot import ParkingLot
+
+
+class ParkingBenchmarkTest(unittest.TestCase):
+    def test_instances_are_reproducible_and_feasible(self):
+        for density in (0.0, 0.2, 0.8):
+            start, target, constraints = generate_instance(10, density, 3)
+            self.assertEqual((start, target, constraints),
+                             generate_instance(10, density, 3))
+            self.assertListEqual(sorted(start), list(range(10)))
+            self.assertListEqual(sorted(target), list(range(10)))
+            if density == 0:
+                self.assertIsNone(constraints)
+                continue
+            self.assertEqual(len(constraints), round(density * 10))
+            # the target state does not contradict the constraints
+            ParkingLot(start, 0, constraints)._validate_feasibility(
+                ParkingLot(target).state)
+
+    def test_run_and_compare(self):
+        report = run(sizes=(3, 5, 20), densities=(0.0, 0.4), max_paths=5)
+        planners = [(record["size"], record["density"], record["planner"])
+                    for record in report["results"]]
+        self.assertIn((20, 0.0, "get_moves[cycles]"), planners)
+        self.assertIn((5, 0.4, "get_moves[astar]"), planners)
+        self.assertNotIn((3, 0.4, "get_moves[cycles]"), planners)
+        self.assertNotIn((20, 0.4, "get_moves[dfs]"), planners)
+        for record in report["results"]:
+            self.assertEqual(record["status"], "ok")
+            self.assertGreater(record["peak_bytes"], 0)
+        self.assertListEqual(compare(report, report), [])
+
+        slower = {"results": [dict(record) for record in report["results"]]}
+        slower["results"][0]["seconds"] *= 2
+        slower["results"][1]["result"] += 1
+        self.assertEqual(len(compare(report, slower)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Caches move sequences of rearrangements up to relabelling of the cars.
+
+The moves leading from one state to another depend only on where each car
+has to go and on which slots it may use, not on the car itself. Hence a car
+is relabelled by its target slot: the key of a problem is the permutation of
+the target slots over the current slots and the label of the empty slot,
+with the constraints expressed in the same labels. A cached sequence is
+relabelled back to the cars of the target state of each problem sharing the
+key.
+"""
+
+import collections
+from typing import List, Set, Dict, Hashable, Optional, Tuple
+
+from parking_state import ParkingState, CarType, MoveType
+
+
+class SolutionCache:
+    """Implements an LRU cache of move sequences, shareable between lots.
+
+    Attributes:
+        maxsize: Maximal number of cached sequences.
+        hits: Number of lookups that found a sequence.
+        misses: Number of lookups that did not.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize < 1:
+            raise ValueError(f"Invalid cache size: {maxsize}. Expected > 0.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(mode: str, state: ParkingState, target_state: ParkingState,
+                 constraints: Optional[Dict[int, Set[CarType]]]) -> Hashable:
+        """Returns the key of a problem, the same for any labels of the cars.
+
+        Args:
+            mode: Search mode (see ParkingLot.get_moves).
+            state: The current arrangement of the cars.
+            target_state: The target arrangement of the cars.
+            constraints: A map of constraints telling which cars (values)
+            can be moved to which slots (keys).
+        """
+        target_positions = target_state._positions
+        permutation = tuple(target_positions[car] for car in state.cars)
+        # an empty lot has no empty slot
+        empty = target_positions.get(state.symbol_empty)
+        if constraints is None:
+            return mode, permutation, empty, None
+        pattern = tuple(sorted(
+            (position, frozenset(target_positions[car] for car in cars))
+            for position, cars in constraints.items()))
+        return mode, permutation, empty, pattern
+
+    def lookup(self, key: Hashable, target_state: ParkingState) \
+            -> Tuple[bool, Optional[List[MoveType]]]:
+        """Finds the moves of a problem, relabelled to the target state cars.
+
+        Returns:
+            (True, moves) if the key is cached, where moves may be None if the
+            problem has no solution, and (False, None) otherwise.
+        """
+        if key not in self._entries:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        path = self._entries[key]
+        if path is None:
+            return True, None
+        return True, [MoveType(target_state.cars[slot], position)
+                      for slot, position in path]
+
+    def store(self, key: Hashable, target_state: ParkingState,
+              path: Optional[List[MoveType]]):
+        """Caches the moves of a problem, evicting the least recently used."""
+        if path is not None:
+            path = tuple((target_state._positions[car], position)
+                         for car, position in path)
+        self._entries[key] = path
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+import unittest
+from parking_cache import SolutionCache
+from parking_lot import ParkingLot
+from parking_state import ParkingState
+
+
+class SolutionCacheTest(unittest.TestCase):
+    def test_invalid_size(self):
+        self.assertRaises(ValueError, SolutionCache, 0)
+
+    def test_relabelled_hit(self):
+        cache = SolutionCache()
+        first = ParkingLot([1, 2, 0, 3], 0, {2: {3}}, cache)
+        self.assertListEqual(first.get_moves([2, 3, 0, 1]),
+                             [(3, 2), (1, 3), (2, 0), (3, 1)])
+        second = ParkingLot(["a", "b", "", "c"], "", {2: {"c"}}, cache)
+        self.assertListEqual(second.get_moves(["b", "c", "", "a"]),
+                             [("c", 2), ("a", 3), ("b", 0), ("c", 1)])
+        self.assertListEqual(second.state.cars, ["b", "c", "", "a"])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_empty_slot_in_key(self):
+        cache = SolutionCache()
+        ParkingLot([1, 0, 2], 0, None, cache).get_moves([0, 1, 2])
+        second = ParkingLot([0, 1, 2], 0, None, cache)
+        self.assertListEqual(second.get_moves([1, 0, 2]), [(1, 0)])
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_empty_lot(self):
+        cache = SolutionCache()
+        self.assertListEqual(ParkingLot([], cache=cache).get_moves([]), [])
+        self.assertListEqual(ParkingLot([], cache=cache).get_moves([]), [])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_different_constraints_miss(self):
+        cache = SolutionCache()
+        ParkingLot([1, 2, 0, 3], 0, {2: {3}}, cache).get_moves([2, 3, 0, 1])
+        ParkingLot([1, 2, 0, 3], 0, {2: {1}}, cache).get_moves([2, 3, 0, 1])
+        ParkingLot([1, 2, 0, 3], 0, None, cache).get_moves([2, 3, 0, 1])
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+    def test_no_solution_cached(self):
+        cache = SolutionCache()
+        state, target = ParkingState([1, 0, 2]), ParkingState([2, 0, 1])
+        key = cache.make_key("dfs", state, target, {0: {0}})
+        cache.store(key, target, None)
+        self.assertEqual(cache.lookup(key, target), (True, None))
+
+    def test_unreachable_target_not_searched(self):
+        cache = SolutionCache()
+        parking_lot = ParkingLot([0, 1, 2], 0, {0: set()}, cache)
+        self.assertIsNone(parking_lot.get_moves([0, 2, 1]))
+        self.assertListEqual(parking_lot.state.cars, [0, 1, 2])
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
+
+    def test_least_recently_used_evicted(self):
+        cache = SolutionCache(maxsize=2)
+        parking_lot = ParkingLot([0, 1, 2], 0, None, cache)
+        for target in ([1, 0, 2], [2, 1, 0], [0, 1, 2], [2, 1, 0]):
+            parking_lot.get_moves(target, retain_state=True)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
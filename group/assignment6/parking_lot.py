@@ -7,18 +7,28 @@ support validation and swapping functionality (see class ParkingState);
     - Representation of the sequence of moves (List[MoveType]).
 
 Computes:
-1) Given target state, computes the shortest sequence of moves to obtain it.
+1) Given target state, computes the shortest sequence of moves to obtain it
+(in linear time, by resolving the cycles of the permutation).
 2) Given target state and set of constraints, computes a sequence of moves 
-which are inline with the given constraints.
+which are inline with the given constraints (optionally the shortest one,
+using A*, IDA* or bidirectional breadth-first search).
 3) Given target state, computes all the possible sequence of moves that lead 
 from the start to the target state, without ever repeating the same 
-configuration more than once.
+configuration more than once (optionally streaming them, shortest first,
+storing them in a trie sharing their prefixes, or only counting them).
 """
 
-import copy
-from typing import List, Set, Dict
+import contextlib
+import itertools
+from typing import List, Set, Dict, Tuple, Optional, Iterator, Generator
 
-from parking_state import ParkingState, CarType, MoveType
+from parking_cache import SolutionCache
+from parking_moves import CompactMoves
+from parking_plan import CyclePlan
+from parking_table import DistanceTable, MAX_SIZE
+from parking_trie import PathTrie
+from parking_state import (ParkingState, SearchStats, BudgetExhausted,
+                           CarType, MoveType)
 
 
 class ParkingLot:
@@ -32,54 +42,518 @@ class ParkingLot:
         start: Ordered list of cars/empty slot.
         empty: Object representing the empty slot, used in start.
         constraints: A map of <position, allowed cars for the position>.
+        cache: A cache of move sequences (see SolutionCache), possibly shared
+        with other lots, or None.
+        tables: The distance tables used by get_moves (see
+        add_distance_table), by key.
 
     Raises:
         TypeError, ValueError: See input validation in the ParkingState class.
     """
 
+    SEARCH_MODES = ("cycles", "dfs", "astar", "idastar", "bidirectional")
+
     def __init__(self, start: List[CarType], empty: CarType = 0,
-                 constraints: Dict[int, Set[CarType]] = None):
+                 constraints: Dict[int, Set[CarType]] = None,
+                 cache: SolutionCache = None):
+        self._state = None
         self.state = ParkingState(start, empty)
-        if constraints is not None:
-            self._validate_constraints(constraints)
-        self.constraints = constraints
-        self._seen_states = set()
+        self.update_constraints(constraints)
+        self.cache = cache
+        self.tables = {}
 
     def __len__(self):
         return len(self.state)
 
+    @property
+    def state(self) -> ParkingState:
+        """Returns the current state (see class ParkingState)."""
+        return self._state
+
+    @state.setter
+    def state(self, state: ParkingState):
+        """Replaces the current state, re-encoding the copy searched.
+
+        The searches run on an encoded copy of the state (see
+        `_prepare_states`), which follows the moves of the lot, and is
+        created again from the new state when needed. The codes of the cars
+        are kept unless the new state holds other cars.
+
+        Raises:
+            TypeError: The state is not a ParkingState.
+            ValueError: The new state holds other cars than a lot with
+            constraints.
+        """
+        if not isinstance(state, ParkingState):
+            raise TypeError(f"Unsupported state type: {type(state)}. "
+                            f"Expected ParkingState.")
+        previous = self._state
+        if previous is None or previous.symbol_empty != state.symbol_empty \
+                or not previous._same_cars(state):
+            if previous is not None and self.constraints is not None:
+                raise ValueError("The constraints are for other cars. "
+                                 "Cannot replace the state.")
+            empty = state.symbol_empty
+            self._cars = [empty] + [car for car in state.cars if car != empty]
+            self._codes = {car: code for code, car in enumerate(self._cars)}
+        self._state = state
+        self._working = None
+        self._working_mutations = None
+
     def get_moves(self, target_state: List[CarType],
-                  retain_state: bool = False) -> List[MoveType]:
+                  retain_state: bool = False, mode: str = None,
+                  stats: SearchStats = None, budget_nodes: int = None,
+                  deadline: float = None) -> List[MoveType]:
         """Computes a sequence of moves from the start state to the target one.
 
-        Unless deselected, self.state is updated as the moves are generated,
-        and finally set to target_state.
+        Unless deselected, self.state is set to target_state once the moves
+        are found.
+
+        Search modes:
+            "cycles": the shortest sequence computed directly from the cycles
+            of the permutation (see ParkingState.generate_cycle_path), only
+            applicable without constraints;
+            "dfs": the first path found by the depth-first search (see
+            ParkingState.generate_all_paths);
+            "astar", "idastar": a shortest path found by the informed search
+            (see ParkingState.generate_shortest_path), IDA* uses memory linear
+            in the path length;
+            "bidirectional": a shortest path found by the breadth-first
+            searches from both ends (see get_bidirectional_moves).
+        By default, "cycles" is used without constraints and "dfs" otherwise.
+        With a cache, the moves are looked up before searching, and then
+        cached (see SolutionCache). If a distance table of the problem was
+        added, a shortest sequence is read from it instead of searching, in
+        any mode (see add_distance_table).
+
+        Given a budget, the search stops once it runs out (the linear-time
+        "cycles" mode is not limited). The "dfs" mode then becomes an anytime
+        search: it goes on after the first path, and returns the shortest
+        path found before the budget ran out, or before it found a path as
+        short as the unconstrained minimum. A budgeted search bypasses the
+        cache.
 
         Args:
             target_state: Targeted state (arrangement of cars).
             retain_state: Retains self.state unchanged if True,
-            updates it as moves are generated if False.
+            sets it to target_state if False.
+            mode: One of SEARCH_MODES, or None to select it automatically.
+            stats: Collects the statistics of the search if given (see
+            SearchStats), nothing is collected on a cache hit.
+            budget_nodes: Maximal number of states to expand, if given.
+            deadline: Value of time.monotonic() when the search must stop,
+            if given.
 
         Returns:
             List of car moves (car, position) where car is any CarType object,
-            and the latter is the position to which car should be moved.
+            and the latter is the position to which car should be moved,
+            or None if there is no such sequence.
+
+        Raises:
+            ValueError: Unknown or inapplicable search mode.
+            BudgetExhausted: The budget ran out before a path was found.
         """
-        state, target_state = self._prepare_states(retain_state, target_state)
-        return next(state.generate_all_paths([], target_state,
-                                             self._find_diff(target_state),
-                                             self._seen_states,
-                                             self.constraints),
+        mode = self._select_mode(mode)
+        if mode == "cycles" and self.cache is None and not self.tables:
+            return self._get_cycle_moves(target_state, retain_state, stats)
+        state, target_state, displaced_cars, feasible = \
+            self._prepare_states(target_state)
+        if not feasible:
+            return None
+        if budget_nodes is not None or deadline is not None:
+            with self._budget(stats, budget_nodes, deadline) as stats:
+                path = self._search_within_budget(mode, state, target_state,
+                                                  displaced_cars, stats)
+            if path is not None and not retain_state:
+                state._apply_path(path)
+            return self._decode_path(path, retain_state)
+        with self._searching(retain_state):
+            if self.cache is None:
+                path = self._search_path(mode, state, target_state,
+                                         displaced_cars, stats)
+            else:
+                path = self._search_cached_path(mode, state, target_state,
+                                                displaced_cars, stats)
+        return self._decode_path(path, retain_state)
+
+    def _search_path(self, mode: str, state: ParkingState,
+                     target_state: ParkingState, displaced_cars: Set[int],
+                     stats: SearchStats = None) -> Optional[List[MoveType]]:
+        """Runs the search engine of the mode over the encoded states."""
+        if self.tables:
+            found, path = self._search_table(state, target_state)
+            if found:
+                if path is not None:
+                    state._apply_path(path)
+                return path
+        if mode == "cycles":
+            return state.generate_cycle_path(target_state, stats)
+        if mode in ("astar", "idastar"):
+            return state.generate_shortest_path(target_state,
+                                                self._feasibility,
+                                                mode == "idastar", stats)
+        if mode == "bidirectional":
+            meeting_and_path = state.generate_bidirectional_path(
+                target_state, self._feasibility, stats)
+            return meeting_and_path[1] if meeting_and_path else None
+        return next(state.generate_all_paths([], target_state, displaced_cars,
+                                             set(), self._feasibility,
+                                             stats=stats),
                     None)
 
-    def _prepare_states(self, retain_state, target_state):
-        """Creates and validates the current and target ParkingState objects."""
+    def _get_cycle_moves(self, target_state: List[CarType],
+                         retain_state: bool,
+                         stats: SearchStats = None) -> List[MoveType]:
+        """Runs the "cycles" mode on the cars themselves.
+
+        The encoding of the cars only keeps the visited states of the
+        searches compact, and the cycles are resolved without visiting any
+        state twice. So the moves are computed on self.state, or on a copy of
+        it if retain_state, without recording the swaps, and the encoded copy
+        is created again by the next search.
+        """
         target_state = ParkingState(target_state, self.state.symbol_empty)
         self._validate_two_states(target_state)
-        self._validate_feasibility(target_state)
-        state = self.state if not retain_state else copy.deepcopy(self.state)
-        return state, target_state
+        if retain_state:
+            return ParkingState._from_validated(
+                self.state.cars.copy(), self.state.symbol_empty
+            ).generate_cycle_path(target_state, stats)
+        moves = self.state.generate_cycle_path(target_state, stats)
+        self._working = None
+        return moves
+
+    def get_compact_moves(self, target_state: List[CarType],
+                          retain_state: bool = False) -> CompactMoves:
+        """Computes the moves of the "cycles" mode, stored as integer arrays.
+
+        The moves are those of get_moves (in "cycles" mode), but stored in a
+        CompactMoves of the codes of the cars, which takes 2 machine words per
+        move, and decodes the cars when accessed. No undo log is kept while
+        computing them, the encoded state is created again if retain_state.
+
+        Args:
+            target_state: Targeted state (arrangement of cars).
+            retain_state: Retains self.state unchanged if True,
+            sets it to target_state if False.
+
+        Returns:
+            CompactMoves of the car moves (car, position).
+
+        Raises:
+            ValueError: The lot has constraints.
+        """
+        self._select_mode("cycles")
+        state, target_state, _, _ = self._prepare_states(target_state)
+        moves = state.generate_cycle_path(target_state,
+                                          moves=CompactMoves(self._cars))
+        if retain_state:
+            self._working = None
+        else:
+            self.state._apply_path(moves)
+            self._working_mutations = self.state._mutations
+        return moves
+
+    def _search_within_budget(self, mode: str, state: ParkingState,
+                              target_state: ParkingState,
+                              displaced_cars: Set[int], stats: SearchStats) \
+            -> Optional[List[MoveType]]:
+        """Searches until the budget of stats runs out, leaves state unchanged.
+
+        Raises:
+            BudgetExhausted: The budget ran out before a path was found.
+        """
+        with self._searching():
+            if mode != "dfs":
+                return self._search_path(mode, state, target_state,
+                                         displaced_cars, stats)
+            lower_bound = state._count_min_moves(state.cars, target_state)
+            best_path = None
+            try:
+                for path in state.generate_all_paths(
+                        [], target_state, displaced_cars, set(),
+                        self._feasibility, stats=stats):
+                    if best_path is None or len(path) < len(best_path):
+                        best_path = path
+                        if len(best_path) == lower_bound:
+                            break
+            except BudgetExhausted:
+                if best_path is None:
+                    raise
+            return best_path
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _budget(stats: Optional[SearchStats], budget_nodes: Optional[int],
+                deadline: Optional[float]):
+        """Limits stats (a new one if None) to the budget within the block."""
+        if stats is None:
+            stats = SearchStats()
+        limits = stats.max_expanded, stats.deadline
+        stats.max_expanded = (None if budget_nodes is None
+                              else stats.expanded + budget_nodes)
+        stats.deadline = deadline
+        try:
+            yield stats
+        finally:
+            stats.max_expanded, stats.deadline = limits
+
+    def build_distance_table(self, target_state: List[CarType]) \
+            -> DistanceTable:
+        """Computes the distances to the target state from every state.
+
+        The table depends on the constraints and on the target state only
+        through the target slots of the cars, so it serves every target
+        state of the same pattern (see DistanceTable). It is not added to
+        the lot.
+
+        Args:
+            target_state: Targeted state (arrangement of cars).
+
+        Returns:
+            The DistanceTable of the lot and target state.
+
+        Raises:
+            ValueError: The lot is too large for a table (see
+            parking_table.MAX_SIZE).
+        """
+        # checked first: an empty lot has no empty label for the key
+        if not 0 < len(self) <= MAX_SIZE:
+            raise ValueError(f"Invalid table size: {len(self)}. "
+                             f"Expected in [1, {MAX_SIZE}].")
+        _, target_state, _, _ = self._prepare_states(target_state)
+        return DistanceTable.build(*self._get_table_key(target_state))
+
+    def add_distance_table(self, table: DistanceTable):
+        """Makes get_moves walk the table for the target states it serves.
+
+        Raises:
+            ValueError: The table is for a lot of another size.
+        """
+        if table.size != len(self):
+            raise ValueError(f"Table size mismatch, {table.size} != "
+                             f"{len(self)}")
+        self.tables[table.key] = table
+
+    def _get_table_key(self, target_state: ParkingState) \
+            -> Tuple[int, int, Dict[int, Set[int]]]:
+        """Returns the size, empty label and constraints in target labels."""
+        labels = target_state._positions
+        constraints = {position: {labels[car] for car in cars}
+                       for position, cars in
+                       (self._encoded_constraints or {}).items()}
+        return len(self), labels[0], constraints
+
+    def _search_table(self, state: ParkingState, target_state: ParkingState) \
+            -> Tuple[bool, Optional[List[MoveType]]]:
+        """Walks the distance table of the problem, if any.
+
+        Returns:
+            (True, moves) if there is a table, where moves is None if the
+            target cannot be reached, and (False, None) otherwise.
+        """
+        table = self.tables.get(
+            DistanceTable.make_key(*self._get_table_key(target_state)))
+        if table is None:
+            return False, None
+        labels = target_state._positions
+        path = table.walk([labels[car] for car in state.cars])
+        if path is None:
+            return True, None
+        return True, [MoveType(target_state.cars[label], position)
+                      for label, position in path]
+
+    def _search_cached_path(self, mode: str, state: ParkingState,
+                            target_state: ParkingState,
+                            displaced_cars: Set[int],
+                            stats: SearchStats = None) \
+            -> Optional[List[MoveType]]:
+        """Looks the path up in the cache, or searches and caches it."""
+        key = self.cache.make_key(mode, state, target_state,
+                                  self._encoded_constraints)
+        found, path = self.cache.lookup(key, target_state)
+        if found:
+            if path is not None:
+                state._apply_path(path)
+            return path
+        path = self._search_path(mode, state, target_state, displaced_cars,
+                                 stats)
+        self.cache.store(key, target_state, path)
+        return path
+
+    def get_cycle_plan(self, target_state: List[CarType]) -> CyclePlan:
+        """Computes the moves of the "cycles" mode as a plan to execute.
+
+        The plan can follow the execution of its moves and be updated when
+        the target state is edited, recomputing the moves of the edited
+        cycles only (see CyclePlan). self.state is unchanged.
+
+        Args:
+            target_state: Targeted state (arrangement of cars).
+
+        Returns:
+            A CyclePlan of the shortest sequence of moves.
+
+        Raises:
+            ValueError: The lot has constraints.
+        """
+        self._select_mode("cycles")
+        state, target_state, _, _ = self._prepare_states(target_state)
+        # the plan takes the encoded copy over, the next search encodes
+        # another one
+        self._working = None
+        return CyclePlan(self._cars, state, target_state)
+
+    def get_bidirectional_moves(self, target_state: List[CarType],
+                                retain_state: bool = False,
+                                stats: SearchStats = None) \
+            -> Tuple[Optional[List[CarType]], Optional[List[MoveType]]]:
+        """Computes a shortest sequence of moves searching from both ends.
+
+        Args:
+            target_state: Targeted state (arrangement of cars).
+            retain_state: Retains self.state unchanged if True,
+            sets it to target_state if False.
+            stats: Collects the statistics of the search if given.
 
-    def get_all_paths(self, target_state, retain_state=False):
+        Returns:
+            The state where the searches from self.state and from the target
+            state met, and the list of car moves (car, position) through it;
+            (None, None) if there is no such sequence.
+        """
+        state, target_state, _, feasible = self._prepare_states(target_state)
+        if not feasible:
+            return None, None
+        with self._searching(retain_state):
+            meeting_and_path = state.generate_bidirectional_path(
+                target_state, self._feasibility, stats)
+        if meeting_and_path is None:
+            return None, None
+        meeting, path = meeting_and_path
+        return ([self._cars[car] for car in meeting],
+                self._decode_path(path, retain_state))
+
+    def get_moves_to_many(self, target_states: List[List[CarType]],
+                          stats: SearchStats = None) \
+            -> List[Optional[List[MoveType]]]:
+        """Computes a shortest sequence of moves to each of the target states.
+
+        Without constraints, each sequence is computed from the cycles of its
+        permutation (see get_moves). With constraints, a single breadth-first
+        search from self.state is shared by all the targets (see
+        ParkingState.generate_paths_to_many), instead of a search per target.
+        self.state is unchanged.
+
+        Args:
+            target_states: The targeted states (arrangements of cars).
+            stats: Collects the statistics of the searches if given.
+
+        Returns:
+            For each target state, the list of car moves (car, position), or
+            None if there is no such sequence.
+        """
+        prepared_states = [self._prepare_states(target_state)
+                           for target_state in target_states]
+        moves = [None] * len(target_states)
+        if self._select_mode(None) == "cycles":
+            for index, (state, target_state, _, _) in enumerate(
+                    prepared_states):
+                with self._searching():
+                    moves[index] = self._decode_path(
+                        state.generate_cycle_path(target_state, stats))
+            return moves
+        indices = [index for index, (_, _, _, feasible)
+                   in enumerate(prepared_states) if feasible]
+        with self._searching():
+            paths = self._working.generate_paths_to_many(
+                [prepared_states[index][1] for index in indices],
+                self._feasibility, stats)
+        for index, path in zip(indices, paths):
+            moves[index] = self._decode_path(path)
+        return moves
+
+    def _select_mode(self, mode: str) -> str:
+        """Validates the search mode, or selects one if it is None."""
+        if mode is None:
+            return "dfs" if self.constraints else "cycles"
+        if mode not in self.SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}. "
+                             f"Expected one of {self.SEARCH_MODES}.")
+        if mode == "cycles" and self.constraints:
+            raise ValueError("Search mode 'cycles' ignores constraints.")
+        return mode
+
+    def _prepare_states(self, target_state: List[CarType]) \
+            -> Tuple[ParkingState, ParkingState, Set[int], bool]:
+        """Creates, validates and encodes the target state.
+
+        The search runs over cars encoded as small integers (the empty slot
+        is 0), which keeps the visited states compact and cheap to hash.
+        It runs on the encoded copy of self.state kept by the lot, which
+        follows self.state (see `_searching`), and never touches self.state.
+        The copy is created again here if self.state was replaced (see the
+        state property) or moved without it, e.g. by
+        ParkingState.apply_moves, which the count of its moves tells.
+
+        Returns:
+            The encoded current and target ParkingState objects, the set of
+            encoded cars that are not in their target positions, and False if
+            the target state provably cannot be reached (see
+            `_validate_feasibility`).
+        """
+        target_state = ParkingState(target_state, self.state.symbol_empty)
+        self._validate_two_states(target_state)
+        feasible = self._validate_feasibility(target_state)
+        if self._working is None \
+                or self._working_mutations != self.state._mutations:
+            self._working = self._encode(self.state.cars)
+            self._working_mutations = self.state._mutations
+        encoded_target = self._encode(target_state.cars)
+        displaced_cars = {code for code, end_code
+                          in zip(self._working.cars, encoded_target.cars)
+                          if code != end_code and code != 0}
+        return self._working, encoded_target, displaced_cars, feasible
+
+    @contextlib.contextmanager
+    def _searching(self, retain_state: bool = True):
+        """Keeps or undoes what a search did to the encoded copy of self.state.
+
+        The search either finds a path and leaves the state at its end, or
+        restores it. The swaps on the path are recorded (see
+        ParkingState.snapshot) and undone if retain_state, so no copy of the
+        state is needed. They are also undone if the search fails.
+        """
+        self._working.snapshot()
+        try:
+            yield
+        except BaseException:
+            self._working.rollback()
+            raise
+        if retain_state:
+            self._working.rollback()
+        else:
+            self._working.release()
+
+    def _encode(self, cars: List[CarType]) -> ParkingState:
+        """Creates a ParkingState of the cars replaced by their codes.
+
+        The cars must be those of a validated state, so the codes are valid.
+        """
+        return ParkingState._from_validated([self._codes[car] for car in cars],
+                                            0)
+
+    def _decode_path(self, path: Optional[List[MoveType]],
+                     retain_state: bool = True) -> Optional[List[MoveType]]:
+        """Replaces the codes by the cars, moves them unless retain_state."""
+        if path is None:
+            return None
+        moves = [MoveType(self._cars[car], position) for car, position in path]
+        if not retain_state:
+            self.state._apply_path(moves)
+            self._working_mutations = self.state._mutations
+        return moves
+
+    def get_all_paths(self, target_state, retain_state=False, stats=None,
+                      budget_nodes=None, deadline=None):
         """Computes all possible paths leading from the state to the target state.
 
         It does not have a single sequence that has the same parking lot
@@ -88,19 +562,224 @@ class ParkingLot:
 
         Args:
             target_state: Targeted state (arrangement of cars).
-            retain_state: Retains self.state unchanged if True,
-            updates it as moves are generated if False.
+            retain_state: Unused, self.state is unchanged once all the paths
+            have been traversed.
+            stats: Collects the statistics of the search if given.
+            budget_nodes: Maximal number of states to expand, if given.
+            deadline: Value of time.monotonic() when the search must stop,
+            if given.
 
         Returns:
             A list of all possible paths leading from the start state to the
             target state, sorted by length (shortest first).
+
+        Raises:
+            BudgetExhausted: The budget ran out, its paths attribute holds the
+            paths found so far, sorted by length.
         """
-        state, target_state = self._prepare_states(retain_state, target_state)
-        return sorted(
-            state.generate_all_paths([], target_state,
-                                     self._find_diff(target_state),
-                                     self._seen_states, self.constraints),
-            key=lambda path: len(path))
+        state, target_state, displaced_cars, feasible = \
+            self._prepare_states(target_state)
+        if not feasible:
+            return []
+        if budget_nodes is not None or deadline is not None:
+            with self._budget(stats, budget_nodes, deadline) as stats:
+                return self._collect_all_paths(state, target_state,
+                                               displaced_cars, stats)
+        return self._collect_all_paths(state, target_state, displaced_cars,
+                                       stats)
+
+    def _collect_all_paths(self, state: ParkingState,
+                           target_state: ParkingState,
+                           displaced_cars: Set[int],
+                           stats: Optional[SearchStats]) \
+            -> List[List[MoveType]]:
+        """Decodes and sorts all the paths, or those found within budget."""
+        paths = []
+        with self._searching():
+            try:
+                for path in state.generate_all_paths(
+                        [], target_state, displaced_cars, set(),
+                        self._feasibility, stats=stats):
+                    paths.append(self._decode_path(path))
+            except BudgetExhausted as error:
+                error.paths = sorted(paths, key=len)
+                raise
+        return sorted(paths, key=len)
+
+    def get_path_trie(self, target_state: List[CarType],
+                      stats: SearchStats = None) -> PathTrie:
+        """Computes the paths of get_all_paths, stored as a trie of moves.
+
+        The paths share their common prefixes instead of being copied, so
+        storing them takes memory in the number of distinct prefixes. The
+        trie generates the paths as lists on demand, in the order they were
+        found (not sorted by length).
+
+        Args:
+            target_state: Targeted state (arrangement of cars).
+            stats: Collects the statistics of the search if given.
+
+        Returns:
+            A PathTrie of all possible paths leading from the start state to
+            the target state.
+        """
+        state, target_state, displaced_cars, feasible = \
+            self._prepare_states(target_state)
+        trie = PathTrie(self._cars)
+        if not feasible:
+            return trie
+        with self._searching():
+            for path, shared in state._walk_paths([], target_state,
+                                                  displaced_cars, set(),
+                                                  self._feasibility,
+                                                  stats=stats):
+                trie.insert(path, shared)
+        return trie
+
+    def get_path_prefixes(self, target_state: List[CarType], length: int) \
+            -> List[List[MoveType]]:
+        """Cuts the search of get_all_paths at a given number of moves.
+
+        Each path of get_all_paths either is one of the prefixes or starts
+        with one of them (see get_paths_with_prefix), so the prefixes split
+        the search into independent parts.
+
+        Args:
+            target_state: Targeted state (arrangement of cars).
+            length: Number of moves of the prefixes, the paths found before
+            are complete.
+
+        Returns:
+            The prefixes of the paths, in the order of the search.
+
+        Raises:
+            ValueError: The length is negative.
+        """
+        if length < 0:
+            raise ValueError(f"Invalid prefix length: {length}. "
+                             "Expected >= 0.")
+        state, target_state, displaced_cars, feasible = \
+            self._prepare_states(target_state)
+        if not feasible:
+            return []
+        with self._searching():
+            return [self._decode_path(prefix.copy()) for prefix, _
+                    in state._walk_paths([], target_state, displaced_cars,
+                                         set(), self._feasibility,
+                                         frontier_length=length)]
+
+    def get_paths_with_prefix(self, target_state: List[CarType],
+                              prefix: List[MoveType],
+                              stats: SearchStats = None) \
+            -> List[List[MoveType]]:
+        """Computes the paths of get_all_paths starting with a prefix.
+
+        Args:
+            target_state: Targeted state (arrangement of cars).
+            prefix: A prefix returned by get_path_prefixes.
+            stats: Collects the statistics of the search if given.
+
+        Returns:
+            The paths, in the order of the search (not sorted by length).
+        """
+        state, target_state, displaced_cars, feasible = \
+            self._prepare_states(target_state)
+        if not feasible:
+            return []
+        seen_states = set()
+        moves = []
+        with self._searching():
+            for car, position in prefix:
+                seen_states.add(state._pack(state.cars))
+                empty_position = state._positions[0]
+                car = self._codes[car]
+                state._update_displaced_cars(displaced_cars, empty_position,
+                                             car, target_state)
+                moves.append(state._swap_cars_and_pos(state._positions[car],
+                                                      empty_position))
+            return [self._decode_path(path) for path
+                    in state.generate_all_paths(moves, target_state,
+                                                displaced_cars, seen_states,
+                                                self._feasibility,
+                                                stats=stats)]
+
+    def iter_all_paths(self, target_state: List[CarType],
+                       max_paths: int = None, max_length: int = None,
+                       stats: SearchStats = None) \
+            -> Iterator[List[MoveType]]:
+        """Lazily generates the paths of get_all_paths, shortest first.
+
+        The paths of each length are generated by a depth-first search cut
+        off at that length (iterative deepening), starting from the minimal
+        count of moves, so the memory does not grow with the number of paths,
+        at the cost of repeating the shallower part of the search. The paths
+        of the same length are in the same order as in get_all_paths.
+
+        Args:
+            target_state: Targeted state (arrangement of cars).
+            max_paths: Stops after this many paths if given.
+            max_length: Stops after the paths of this length if given.
+            stats: Collects the statistics of all the searches if given.
+
+        Returns:
+            An iterator over the paths (lists of car moves) in nondecreasing
+            order of length.
+        """
+        _, target_state, displaced_cars, feasible = \
+            self._prepare_states(target_state)
+        if not feasible:
+            return iter(())
+        # the iterator can be suspended for long, so it gets its own state
+        state = self._encode(self.state.cars)
+        paths = self._generate_paths_by_length(state, target_state,
+                                               displaced_cars, max_length,
+                                               stats)
+        return itertools.islice(paths, max_paths)
+
+    def _generate_paths_by_length(self, state: ParkingState,
+                                  target_state: ParkingState,
+                                  displaced_cars: Set[int],
+                                  max_length: Optional[int],
+                                  stats: SearchStats = None) \
+            -> Generator[List[MoveType], None, None]:
+        """Repeats the depth-first search while some path was cut off."""
+        lower_bound = state._count_min_moves(state.cars, target_state)
+        for length in itertools.count(lower_bound):
+            if max_length is not None and length > max_length:
+                return
+            paths = state.generate_all_paths([], target_state, displaced_cars,
+                                             set(), self._feasibility,
+                                             length, stats)
+            while True:
+                try:
+                    path = next(paths)
+                except StopIteration as stop:
+                    cut_off = stop.value
+                    break
+                yield self._decode_path(path)
+            if not cut_off:
+                return
+
+    def count_paths(self, target_state: List[CarType],
+                    max_length: int = None, stats: SearchStats = None) -> int:
+        """Counts the paths get_all_paths would return, without creating them.
+
+        Args:
+            target_state: Targeted state (arrangement of cars).
+            max_length: If given, only the paths up to this length are counted.
+            stats: Collects the statistics of the search if given.
+
+        Returns:
+            The number of paths leading from self.state to the target state.
+        """
+        state, target_state, displaced_cars, feasible = \
+            self._prepare_states(target_state)
+        if not feasible:
+            return 0
+        with self._searching():
+            return state.count_paths(target_state, displaced_cars, set(),
+                                     self._feasibility, max_length,
+                                     stats=stats)
 
     def _validate_constraints(self, constraints: Dict[int, Set[CarType]]):
         """Validates if constraints are applicable to the input.
@@ -128,9 +807,9 @@ class ParkingLot:
             if not isinstance(cars, set):
                 raise TypeError(f"Unsupported cars type: {type(cars)}. "
                                 f"Expected set.")
-            if not 0 <= position <= len(self):
+            if not 0 <= position < len(self):
                 raise ValueError(
-                    f"Out of bounds. {position} not in [0, {len(self)}]")
+                    f"Out of bounds. {position} not in [0, {len(self)})")
             if len(cars & set(self.state.cars)) != len(cars):
                 raise ValueError("Unrecognized vehicle(s).")
 
@@ -145,26 +824,71 @@ class ParkingLot:
             raise ValueError(
                 f"The two states have different empty slot symbols: "
                 f"{self.state.symbol_empty} & {state.symbol_empty}.")
-        if set(self.state.cars) != set(state.cars):
+        if not self.state._same_cars(state):
             raise ValueError(
                 "The two sets of cars are different. Cannot find moves.")
 
-    def _validate_feasibility(self, target_state: ParkingState):
-        """Checks for contradiction between constraints and the target state.
+    def _validate_feasibility(self, target_state: ParkingState) -> bool:
+        """Checks whether the constraints allow to reach the target state.
+
+        A contradiction between the constraints and the target state is an
+        error. Otherwise, the target state is unreachable if a slot that must
+        be emptied can never be empty (see `_find_reachable_empty_slots`):
+        the target slot of the empty slot, and the target slot of each car
+        that is not in it, as the car can only move there when it is empty.
+        The check is polynomial but not complete, the search decides the
+        instances it lets through.
 
         Args:
             target_state: A ParkingState instance.
 
+        Returns:
+            False if the target state provably cannot be reached, True if it
+            may be reached.
+
         Raises:
             ValueError: If there is a contradiction between constraints
             and target state.
         """
         if self.constraints is None:
-            return
+            return True
         for pos, car in enumerate(target_state.cars):
             if pos in self.constraints and car not in self.constraints[pos]:
                 raise ValueError(
                     "Found contradiction between constraints and target state.")
+        reachable = self._find_reachable_empty_slots()
+        if len(reachable) == len(self):
+            return True
+        return all(position in reachable
+                   for position, (car, end_car) in enumerate(
+                       zip(self.state.cars, target_state.cars))
+                   if car != end_car)
+
+    def _find_reachable_empty_slots(self) -> Set[int]:
+        """Returns the slots that can become empty, a superset of them.
+
+        A slot becomes empty when its car moves to the empty slot, so the car
+        must be allowed in a slot that can be empty. The car is in its start
+        slot, or in a slot it moved to, which was empty before. Hence, from
+        the current empty slot, the slots that can become empty are closed
+        under: for each car allowed in such a slot, its current slot. Each
+        car and each constraint is visited once.
+        """
+        positions = self.state._get_positions()
+        empty_position = positions[self.state.symbol_empty]
+        reachable = {empty_position}
+        queue = [empty_position]
+        activated_cars = set()
+        while queue:
+            allowed_cars = self.constraints.get(queue.pop())
+            if allowed_cars is None:
+                return set(range(len(self)))  # all cars are allowed there
+            for car in allowed_cars - activated_cars:
+                activated_cars.add(car)
+                if positions[car] not in reachable:
+                    reachable.add(positions[car])
+                    queue.append(positions[car])
+        return reachable
 
     def _find_diff(self, state: "ParkingState") -> Set[CarType]:
         """Returns elements of current state that differ from those of state."""
@@ -174,6 +898,12 @@ class ParkingLot:
 
     def update_constraints(self, constraints: Dict[int, Set[CarType]]):
         """Adds/updates constraints to the current parking state."""
+        self._encoded_constraints = None
         if constraints is not None:
             self._validate_constraints(constraints)
+            self._encoded_constraints = {
+                position: {self._codes[car] for car in cars}
+                for position, cars in constraints.items()}
+        self._feasibility = ParkingState.compile_constraints(
+            self._encoded_constraints, len(self))
         self.constraints = constraints
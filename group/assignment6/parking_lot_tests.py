@@ -1,6 +1,11 @@
 #!/usr/bin/python3
+import copy
+import random
+import sys
+import time
 import unittest
-from parking_state import ParkingState
+from parking_state import (ParkingState, SearchStats, BudgetExhausted,
+                           verify_plan)
 from parking_lot import ParkingLot
 
 
@@ -82,6 +87,9 @@ class ParkingLotTest(unittest.TestCase):
         constraints = [1, 2, 3]
         self.assertRaises(TypeError, ParkingLot, [1, 2, 3], 1, constraints)
 
+    def test_constraint_out_of_bounds(self):
+        self.assertRaises(ValueError, ParkingLot, [1, 2, 3], 1, {3: {2}})
+
     def test_validate_feasibility_contradictory(self):
         constraints = {2: {3, 4}}
         parking_lot = ParkingLot([1, 2, 3, 4], 1, constraints)
@@ -150,6 +158,369 @@ class ParkingLotTest(unittest.TestCase):
         parking_lot = ParkingLot(initial, 0, constraints)
         self.assertIsNone(parking_lot.get_moves(final))
 
+    def test_parking_unreachable_slot_not_searched(self):
+        initial = [0, 1, 3, 4, 5, 2]
+        final = [2, 1, 4, 5, 3, 0]
+        constraints = {0: {2}, 1: {1, 2, 3}, 2: {3, 4, 5}, 3: {3, 4, 5},
+                       4: {3, 4, 5}, 5: {2}}
+        parking_lot = ParkingLot(initial, 0, constraints)
+        stats = SearchStats()
+        self.assertIsNone(parking_lot.get_moves(final, stats=stats))
+        self.assertEqual(stats.expanded, 0)
+        self.assertListEqual(parking_lot.get_all_paths(final), [])
+        self.assertListEqual(list(parking_lot.iter_all_paths(final)), [])
+        self.assertEqual(parking_lot.count_paths(final), 0)
+        self.assertEqual(parking_lot.get_bidirectional_moves(final),
+                         (None, None))
+        # slots 2, 3 and 4 can never be emptied, so they must stay as they are
+        self.assertIsNotNone(parking_lot.get_moves([2, 1, 3, 4, 5, 0]))
+
+    def test_parking_large_unreachable_slots(self):
+        initial = list(range(2000))
+        final = initial.copy()
+        final[-2:] = final[:-3:-1]
+        constraints = {position: {position} for position in range(1998)}
+        constraints[0] = {1}
+        constraints[1998] = constraints[1999] = {1998, 1999}
+        parking_lot = ParkingLot(initial, 0, constraints)
+        self.assertIsNone(parking_lot.get_moves(final))
+        self.assertTrue(parking_lot._validate_feasibility(
+            ParkingState([1, 0] + initial[2:])))
+
+    def test_parking_large_unconstrained(self):
+        random.seed(8)
+        initial = list(range(20000))
+        final = initial.copy()
+        random.shuffle(final)
+        parking_lot = ParkingLot(initial.copy())
+        moves = parking_lot.get_moves(final)
+        self.assertListEqual(parking_lot.state.cars, final)
+        # each displaced car moves once, plus once per cycle without the empty
+        target_positions = {car: pos for pos, car in enumerate(final)}
+        visited = set()
+        expected = 0
+        for pos in range(len(initial)):
+            cycle = []
+            while pos not in visited:
+                visited.add(pos)
+                cycle.append(initial[pos])
+                pos = target_positions[initial[pos]]
+            if 0 in cycle:
+                expected += len(cycle) - 1
+            elif len(cycle) > 1:
+                expected += len(cycle) + 1
+        self.assertEqual(len(moves), expected)
+
+    def test_parking_compact_moves(self):
+        random.seed(17)
+        initial = list(range(5000))
+        final = initial.copy()
+        random.shuffle(final)
+        moves = ParkingLot(initial.copy()).get_moves(final)
+        parking_lot = ParkingLot(initial.copy())
+        compact_moves = parking_lot.get_compact_moves(final, retain_state=True)
+        self.assertEqual(compact_moves, moves)
+        self.assertListEqual(parking_lot.state.cars, initial)
+        self.assertEqual(parking_lot.get_compact_moves(final), moves)
+        self.assertListEqual(parking_lot.state.cars, final)
+        self.assertEqual(parking_lot.get_moves(initial, retain_state=True),
+                         ParkingLot(final.copy()).get_moves(initial))
+        self.assertRaises(ValueError, ParkingLot([1, 0], 0, {0: {1}})
+                          .get_compact_moves, [0, 1])
+
+    def test_parking_unconstrained_is_shortest(self):
+        initial = [1, 2, 0, 3]
+        final = [3, 1, 0, 2]
+        shortest = ParkingLot(initial.copy()).get_all_paths(final)[0]
+        self.assertEqual(len(ParkingLot(initial).get_moves(final)),
+                         len(shortest))
+
+    def test_parking_deeper_than_recursion_limit(self):
+        initial = list(range(sys.getrecursionlimit() + 500))
+        final = initial[1:] + initial[:1]
+        parking_lot = ParkingLot(initial)
+        moves = parking_lot.get_moves(final, mode="dfs")
+        self.assertEqual(len(moves), len(initial) - 1)
+        self.assertListEqual(parking_lot.state.cars, final)
+
+    def test_parking_idastar_deeper_than_recursion_limit(self):
+        initial = list(range(sys.getrecursionlimit() + 500))
+        final = initial[1:] + initial[:1]
+        parking_lot = ParkingLot(initial)
+        moves = parking_lot.get_moves(final, mode="idastar")
+        self.assertEqual(len(moves), len(initial) - 1)
+        self.assertListEqual(parking_lot.state.cars, final)
+
+    def test_parking_count_paths_deeper_than_recursion_limit(self):
+        initial = list(range(sys.getrecursionlimit() + 500))
+        final = initial[1:] + initial[:1]
+        parking_lot = ParkingLot(initial)
+        self.assertEqual(parking_lot.count_paths(final, len(initial) - 1), 1)
+        self.assertListEqual(parking_lot.state.cars, initial)
+
+    def test_parking_constraints_with_labels(self):
+        initial = ["a", "b", "", "c"]
+        final = ["b", "c", "", "a"]
+        parking_lot = ParkingLot(initial, "", {2: {"c"}})
+        self.assertListEqual(parking_lot.get_moves(final, retain_state=True),
+                             [("c", 2), ("a", 3), ("b", 0), ("c", 1)])
+        self.assertListEqual(parking_lot.state.cars, ["a", "b", "", "c"])
+
+    def test_parking_constraints_repeated_queries(self):
+        initial = [1, 2, 0, 3]
+        final = [2, 3, 0, 1]
+        parking_lot = ParkingLot(initial.copy(), 0, {2: {3}})
+        self.assertIsNotNone(parking_lot.get_moves(final))
+        self.assertIsNotNone(parking_lot.get_moves(initial))
+        self.assertListEqual(parking_lot.state.cars, initial)
+
+    def test_parking_constraints_state_retained(self):
+        initial = [1, 2, 0, 3]
+        final = [2, 3, 0, 1]
+        parking_lot = ParkingLot(initial.copy(), 0, {2: {3}})
+        for mode in ParkingLot.SEARCH_MODES[1:]:
+            expected = parking_lot.get_moves(final, retain_state=True,
+                                             mode=mode)
+            self.assertListEqual(parking_lot.state.cars, initial)
+            self.assertListEqual(parking_lot._working.cars, initial)
+            self.assertListEqual(parking_lot.get_moves(final, mode=mode),
+                                 expected)
+            self.assertListEqual(parking_lot._working.cars, final)
+            parking_lot.get_moves(initial)
+
+    def test_parking_search_after_cycles(self):
+        parking_lot = ParkingLot([1, 2, 0, 3])
+        parking_lot.get_moves([3, 1, 2, 0], retain_state=True)
+        parking_lot.get_moves([2, 0, 1, 3])
+        self.assertListEqual(parking_lot.get_moves([2, 0, 1, 3], mode="dfs"),
+                             [])
+        self.assertEqual(len(parking_lot.get_moves([1, 2, 0, 3],
+                                                   mode="astar")), 2)
+
+    def test_parking_state_replaced(self):
+        parking_lot = ParkingLot([1, 2, 0, 3])
+        parking_lot.state = ParkingState([3, 1, 2, 0])
+        self.assertListEqual(parking_lot.get_moves([3, 1, 2, 0]), [])
+        parking_lot.state = ParkingState(["a", "", "b"], "")
+        self.assertListEqual(parking_lot.get_moves(["", "a", "b"]),
+                             [("a", 1)])
+        self.assertRaises(TypeError, setattr, parking_lot, "state", [1, 0])
+        constrained = ParkingLot([1, 2, 0], 0, {0: {2}})
+        constrained.state = ParkingState([2, 0, 1])
+        self.assertListEqual(constrained.get_moves([2, 1, 0]), [(1, 1)])
+        self.assertRaises(ValueError, setattr, constrained, "state",
+                          ParkingState([1, 0, 3]))
+
+    def test_parking_state_moved_directly(self):
+        for constraints, mode in (({2: {3, 2}}, None), (None, "astar")):
+            parking_lot = ParkingLot([1, 2, 0, 3], 0, constraints)
+            parking_lot.get_moves([2, 3, 0, 1], retain_state=True, mode=mode)
+            parking_lot.state.apply_moves([(2, 2)])
+            moves = parking_lot.get_moves([2, 3, 0, 1], mode=mode)
+            self.assertEqual(verify_plan([1, 0, 2, 3], [2, 3, 0, 1], moves,
+                                         0, constraints), (True, None))
+            self.assertListEqual(parking_lot.state.cars, [2, 3, 0, 1])
+
+
+class ParkingLotShortestPathTest(unittest.TestCase):
+    def setUp(self):
+        self.initial = [1, 2, 3, 4, 5, 0]
+        self.final = [2, 1, 4, 5, 3, 0]
+        self.constraints = {0: {1, 2},
+                            1: {1, 2, 3},
+                            2: {3, 4, 5},
+                            3: {3, 4, 5},
+                            4: {3, 4, 5},
+                            5: {2}}
+
+    def test_unknown_mode(self):
+        parking_lot = ParkingLot([1, 2, 0])
+        self.assertRaises(ValueError, parking_lot.get_moves, [2, 1, 0],
+                          mode="bfs")
+
+    def test_cycles_mode_with_constraints(self):
+        parking_lot = ParkingLot([1, 2, 0], 0, {0: {2}})
+        self.assertRaises(ValueError, parking_lot.get_moves, [2, 1, 0],
+                          mode="cycles")
+
+    def test_a_star_unconstrained(self):
+        moves = ParkingLot([1, 2, 0, 3]).get_moves([2, 3, 0, 1], mode="astar")
+        self.assertEqual(len(moves), 4)
+
+    def test_a_star_is_shortest(self):
+        shortest = min(map(len, ParkingLot(
+            self.initial.copy(), 0,
+            copy.deepcopy(self.constraints)).get_all_paths(self.final)))
+        for mode in ("astar", "idastar"):
+            parking_lot = ParkingLot(self.initial.copy(), 0,
+                                     copy.deepcopy(self.constraints))
+            moves = parking_lot.get_moves(self.final, mode=mode)
+            self.assertEqual(len(moves), shortest)
+            self.assertListEqual(parking_lot.state.cars, self.final)
+
+    def test_a_star_no_solution(self):
+        self.constraints[0] = {2}
+        for mode in ("astar", "idastar"):
+            parking_lot = ParkingLot([0, 1, 3, 4, 5, 2], 0,
+                                     copy.deepcopy(self.constraints))
+            self.assertIsNone(parking_lot.get_moves(self.final, mode=mode))
+            self.assertListEqual(parking_lot.state.cars, [0, 1, 3, 4, 5, 2])
+
+    def test_a_star_larger_constrained(self):
+        random.seed(12)
+        initial = list(range(12))
+        final = initial.copy()
+        random.shuffle(final)
+        constraints = {pos: {car, initial[pos]}
+                       for pos, car in enumerate(final) if pos % 3 == 0}
+        a_star = ParkingLot(initial.copy(), 0, copy.deepcopy(constraints))
+        ida_star = ParkingLot(initial.copy(), 0, copy.deepcopy(constraints))
+        self.assertEqual(len(a_star.get_moves(final, mode="astar")),
+                         len(ida_star.get_moves(final, mode="idastar")))
+        self.assertListEqual(a_star.state.cars, final)
+
+    def test_bidirectional_is_shortest(self):
+        parking_lot = ParkingLot(self.initial.copy(), 0, self.constraints)
+        meeting, moves = parking_lot.get_bidirectional_moves(self.final,
+                                                             retain_state=True)
+        self.assertEqual(len(moves), 7)
+        replayed = ParkingState(self.initial.copy())
+        visited = [replayed.cars.copy()]
+        for move in moves:
+            replayed._apply_path([move])
+            visited.append(replayed.cars.copy())
+        self.assertIn(meeting, visited)
+        self.assertEqual(parking_lot.get_moves(self.final,
+                                               mode="bidirectional"), moves)
+        self.assertListEqual(parking_lot.state.cars, self.final)
+
+    def test_bidirectional_no_solution(self):
+        self.constraints[0] = {2}
+        parking_lot = ParkingLot([0, 1, 3, 4, 5, 2], 0, self.constraints)
+        self.assertEqual(parking_lot.get_bidirectional_moves(self.final),
+                         (None, None))
+
+    def test_moves_to_many(self):
+        targets = [[2, 1, 3, 4, 5, 0], [1, 2, 4, 3, 5, 0], self.final,
+                   [0, 1, 3, 5, 4, 2], self.final, [2, 1, 3, 5, 4, 0]]
+        parking_lot = ParkingLot(self.initial, 0, self.constraints)
+        stats = SearchStats()
+        all_moves = parking_lot.get_moves_to_many(targets, stats)
+        self.assertListEqual(parking_lot.state.cars, self.initial)
+        self.assertEqual(stats.paths_yielded, 5)
+        for target, moves in zip(targets, all_moves):
+            self.assertEqual(
+                len(moves),
+                len(parking_lot.get_moves(target, True, mode="astar")))
+            self.assertListEqual(self._apply(self.initial, moves), target)
+
+    def test_moves_to_many_unreachable(self):
+        self.constraints[0] = {2}
+        initial = [0, 1, 3, 4, 5, 2]
+        parking_lot = ParkingLot(initial, 0, self.constraints)
+        self.assertListEqual(
+            parking_lot.get_moves_to_many([self.final, [2, 1, 3, 4, 5, 0]]),
+            [None, [(2, 0)]])
+
+    def test_moves_to_many_unconstrained(self):
+        initial = [1, 2, 0, 3]
+        targets = [[3, 1, 2, 0], [0, 1, 2, 3], initial]
+        parking_lot = ParkingLot(initial.copy())
+        self.assertListEqual(
+            parking_lot.get_moves_to_many(targets),
+            [parking_lot.get_moves(target, True) for target in targets])
+        self.assertListEqual(parking_lot.state.cars, initial)
+
+    @staticmethod
+    def _apply(cars, moves):
+        cars = cars.copy()
+        for car, position in moves:
+            cars[cars.index(car)], cars[position] = cars[position], car
+        return cars
+
+    def test_search_stats(self):
+        constraints = {0: {1, 3}, 1: {2}, 2: {1, 3}, 3: {2, 3}}
+        for mode in ("dfs", "astar", "idastar", "bidirectional"):
+            with self.subTest(mode=mode):
+                stats = SearchStats()
+                moves = ParkingLot([1, 2, 0, 3], 0, copy.deepcopy(
+                    constraints)).get_moves([3, 2, 1, 0], mode=mode,
+                                            stats=stats)
+                self.assertGreater(stats.expanded, 0)
+                self.assertEqual(stats.paths_yielded, 1)
+                self.assertGreaterEqual(stats.peak_seen, 1)
+                self.assertLess(stats.max_depth, len(moves))
+        stats = SearchStats()
+        moves = ParkingLot([1, 2, 0, 3]).get_moves([3, 1, 2, 0], stats=stats)
+        self.assertEqual(stats.expanded, len(moves))
+
+    def test_bidirectional_equal_states(self):
+        parking_lot = ParkingLot([1, 0, 2])
+        self.assertEqual(parking_lot.get_bidirectional_moves([1, 0, 2]),
+                         ([1, 0, 2], []))
+
+
+class ParkingLotBudgetTest(unittest.TestCase):
+    def test_budget_improves_dfs_path(self):
+        initial, final = [1, 2, 0, 3], [3, 1, 2, 0]
+        first = ParkingLot(initial.copy()).get_moves(final, mode="dfs")
+        parking_lot = ParkingLot(initial.copy())
+        moves = parking_lot.get_moves(final, mode="dfs", budget_nodes=1000)
+        self.assertLessEqual(len(moves), len(first))
+        self.assertEqual(len(moves), 3)
+        self.assertListEqual(parking_lot.state.cars, final)
+
+    def test_budget_without_path(self):
+        initial = list(range(9))
+        final = initial[::-1]
+        for mode in ParkingLot.SEARCH_MODES[1:]:
+            with self.subTest(mode=mode):
+                parking_lot = ParkingLot(initial.copy())
+                with self.assertRaises(BudgetExhausted):
+                    parking_lot.get_moves(final, mode=mode, budget_nodes=2)
+                self.assertListEqual(parking_lot.state.cars, initial)
+                self.assertListEqual(
+                    parking_lot.get_moves(final),
+                    ParkingLot(initial.copy()).get_moves(final))
+
+    def test_deadline(self):
+        initial = list(range(12))
+        final = initial.copy()
+        random.seed(14)
+        random.shuffle(final)
+        began = time.monotonic()
+        moves = ParkingLot(initial.copy(), 0, {1: set(initial)}).get_moves(
+            final, deadline=began + 0.2)
+        self.assertLess(time.monotonic() - began, 1)
+        self.assertIsNotNone(moves)
+        with self.assertRaises(BudgetExhausted):
+            ParkingLot(initial.copy()).get_moves(final, mode="astar",
+                                                 deadline=began)
+
+    def test_budget_restores_stats_limits(self):
+        stats = SearchStats(max_expanded=10 ** 6)
+        ParkingLot([1, 2, 0, 3]).get_moves([3, 1, 2, 0], mode="astar",
+                                           stats=stats, budget_nodes=100)
+        self.assertEqual(stats.max_expanded, 10 ** 6)
+        self.assertIsNone(stats.deadline)
+        self.assertGreater(stats.expanded, 0)
+
+    def test_all_paths_budget(self):
+        parking_lot = ParkingLot([1, 2, 0, 3])
+        all_paths = parking_lot.get_all_paths([3, 1, 2, 0])
+        with self.assertRaises(BudgetExhausted) as context:
+            parking_lot.get_all_paths([3, 1, 2, 0], budget_nodes=10)
+        paths = context.exception.paths
+        self.assertGreater(len(paths), 0)
+        self.assertLess(len(paths), len(all_paths))
+        self.assertListEqual(paths, sorted(paths, key=len))
+        for path in paths:
+            self.assertIn(path, all_paths)
+        self.assertListEqual(parking_lot.state.cars, [1, 2, 0, 3])
+        self.assertListEqual(
+            parking_lot.get_all_paths([3, 1, 2, 0], budget_nodes=10 ** 6),
+            all_paths)
+
 
 class ParkingLotAllPathsTest(unittest.TestCase):
     def test_parking_all_paths_simple(self):
@@ -176,6 +547,75 @@ class ParkingLotAllPathsTest(unittest.TestCase):
                       result)
         self.assertEqual(len(result), len({tuple(path) for path in result}))
 
+    def test_parking_path_trie_same_as_all_paths(self):
+        parking_lot = ParkingLot(["a", "b", "", "c"], "")
+        final = ["c", "a", "b", ""]
+        trie = parking_lot.get_path_trie(final)
+        all_paths = parking_lot.get_all_paths(final)
+        self.assertEqual(len(trie), len(all_paths))
+        self.assertListEqual(sorted(trie, key=len), all_paths)
+        self.assertLess(trie.node_count, sum(map(len, all_paths)) / 2)
+        self.assertListEqual(parking_lot.state.cars, ["a", "b", "", "c"])
+
+    def test_parking_paths_split_by_prefixes(self):
+        parking_lot = ParkingLot([1, 2, 0, 3], 0, {0: {3, 2}})
+        final = [3, 0, 2, 1]
+        paths = list(parking_lot.get_path_trie(final))
+        for length in range(5):
+            prefixes = parking_lot.get_path_prefixes(final, length)
+            self.assertTrue(all(len(prefix) <= length for prefix in prefixes))
+            self.assertListEqual(
+                [path for prefix in prefixes for path
+                 in parking_lot.get_paths_with_prefix(final, prefix)],
+                paths)
+        self.assertListEqual(parking_lot.get_path_prefixes(final, 0), [[]])
+        self.assertRaises(ValueError, parking_lot.get_path_prefixes, final, -1)
+        self.assertListEqual(parking_lot.state.cars, [1, 2, 0, 3])
+
+    def test_parking_iter_all_paths_same_as_all_paths(self):
+        parking_lot = ParkingLot([0, 1, 2])
+        self.assertListEqual(list(parking_lot.iter_all_paths([2, 1, 0])),
+                             parking_lot.get_all_paths([2, 1, 0]))
+
+    def test_parking_iter_all_paths_limits(self):
+        parking_lot = ParkingLot([1, 2, 3, 0, 4, 5])
+        final = [2, 1, 3, 0, 5, 4]
+        shortest = list(parking_lot.iter_all_paths(final, max_paths=3))
+        self.assertEqual(len(shortest), 3)
+        self.assertListEqual([len(path) for path in shortest], [6, 6, 6])
+        self.assertEqual(len(parking_lot.get_moves(final, retain_state=True)),
+                         6)
+        bounded = list(parking_lot.iter_all_paths(final, max_length=8))
+        self.assertEqual(max(len(path) for path in bounded), 8)
+        self.assertEqual(len(bounded), len({tuple(path) for path in bounded}))
+
+    def test_parking_iter_all_paths_pruned(self):
+        initial = list(range(9))
+        final = [0] + initial[:0:-1]
+        parking_lot = ParkingLot(initial)
+        shortest = next(parking_lot.iter_all_paths(final, max_paths=1))
+        self.assertEqual(len(shortest), 12)
+        self.assertEqual(len(parking_lot.get_moves(final, retain_state=True)),
+                         12)
+
+    def test_parking_iter_all_paths_no_solution(self):
+        parking_lot = ParkingLot([0, 1, 2], 0, {0: set()})
+        self.assertListEqual(list(parking_lot.iter_all_paths([0, 2, 1])), [])
+
+    def test_parking_count_paths(self):
+        parking_lot = ParkingLot([1, 2, 0, 3])
+        self.assertEqual(parking_lot.count_paths([3, 1, 2, 0]),
+                         len(parking_lot.get_all_paths([3, 1, 2, 0])))
+        self.assertEqual(parking_lot.count_paths([1, 2, 0, 3]), 1)
+
+    def test_parking_count_paths_max_length(self):
+        parking_lot = ParkingLot([1, 2, 0, 3], 0, {2: {2, 3}})
+        for max_length in (0, 3, 5, 9):
+            self.assertEqual(
+                parking_lot.count_paths([3, 1, 2, 0], max_length),
+                len(list(parking_lot.iter_all_paths([3, 1, 2, 0],
+                                                    max_length=max_length))))
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
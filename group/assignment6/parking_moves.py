@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Stores a long sequence of moves compactly, as two arrays of integers.
+
+A list of N moves holds N MoveType tuples, each with its boxed integers,
+i.e. tens of bytes per move. CompactMoves holds the integer car (e.g. the
+code of ParkingLot) and the destination slot of each move in two parallel
+arrays, 2 machine words per move, and creates the MoveType objects only when
+they are accessed. The arrays can be exported without copying (buffer
+protocol), and written to a file in chunks.
+"""
+
+import array
+import itertools
+from typing import (BinaryIO, Iterator, Optional, Sequence, TextIO, Tuple,
+                    Union)
+
+from parking_state import CarType, MoveType
+
+
+class CompactMoves:
+    """Implements a sequence of moves (car, position) over integer arrays.
+
+    It supports len, indexing (a slice is a new CompactMoves), iteration and
+    comparison with other sequences of moves, like a read-only list of
+    MoveType, and append.
+
+    Attributes:
+        labels: The cars of the integer cars of the moves, used when the
+        moves are accessed, or None to keep the integers.
+    """
+
+    TYPECODE = "l"
+
+    def __init__(self, labels: Sequence[CarType] = None):
+        self.labels = labels
+        self._cars = array.array(self.TYPECODE)
+        self._destinations = array.array(self.TYPECODE)
+
+    def __len__(self):
+        return len(self._cars)
+
+    def __getitem__(self, index: Union[int, slice]) \
+            -> Union[MoveType, "CompactMoves"]:
+        if isinstance(index, slice):
+            moves = CompactMoves(self.labels)
+            moves._cars = self._cars[index]
+            moves._destinations = self._destinations[index]
+            return moves
+        car = self._cars[index]
+        return MoveType(car if self.labels is None else self.labels[car],
+                        self._destinations[index])
+
+    def __iter__(self) -> Iterator[MoveType]:
+        if self.labels is None:
+            return map(MoveType, self._cars, self._destinations)
+        return map(MoveType, map(self.labels.__getitem__, self._cars),
+                   self._destinations)
+
+    def pairs(self) -> Iterator[Tuple[CarType, int]]:
+        """Returns an iterator over the moves as plain (car, position) tuples.
+
+        Creating a MoveType per move dominates the time of iterating, so
+        the replays of many moves read the pairs instead (see
+        ParkingState.apply_moves).
+        """
+        if self.labels is None:
+            return zip(self._cars, self._destinations)
+        return zip(map(self.labels.__getitem__, self._cars),
+                   self._destinations)
+
+    def __eq__(self, other):
+        if not isinstance(other, (CompactMoves, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            move == other_move for move, other_move in zip(self, other))
+
+    def __repr__(self):
+        return f"CompactMoves({list(self)!r})"
+
+    def append(self, move: MoveType):
+        """Adds a move (car, position) of an integer car.
+
+        Raises:
+            BufferError: A buffer of the moves is still exported.
+        """
+        self._cars.append(move[0])
+        self._destinations.append(move[1])
+
+    @property
+    def cars(self) -> memoryview:
+        """Returns the integer cars of the moves, without copying them.
+
+        The moves cannot be appended while the view is alive, release it
+        (memoryview.release) before.
+        """
+        return memoryview(self._cars)
+
+    @property
+    def destinations(self) -> memoryview:
+        """Returns the destination slots of the moves, without copying them.
+
+        The moves cannot be appended while the view is alive, release it
+        (memoryview.release) before.
+        """
+        return memoryview(self._destinations)
+
+    @property
+    def nbytes(self) -> int:
+        """Returns the size of the two arrays in bytes."""
+        return (len(self._cars) + len(self._destinations)) \
+            * self._cars.itemsize
+
+    def write(self, file: TextIO, chunk_size: int = 65536):
+        """Writes the moves as lines "car position" (using the labels).
+
+        At most chunk_size lines are created at a time, so the memory does
+        not grow with the number of moves.
+        """
+        moves = self.pairs()
+        while True:
+            chunk = list(itertools.islice(moves, chunk_size))
+            if not chunk:
+                return
+            file.write("".join(f"{car} {destination}\n"
+                               for car, destination in chunk))
+
+    def write_binary(self, file: BinaryIO):
+        """Writes the integer cars, then the destinations, as raw arrays.
+
+        Use read_binary to read them back with the same typecode.
+        """
+        self._cars.tofile(file)
+        self._destinations.tofile(file)
+
+    @classmethod
+    def read_binary(cls, file: BinaryIO, count: int,
+                    labels: Optional[Sequence[CarType]] = None) \
+            -> "CompactMoves":
+        """Reads count moves written by write_binary.
+
+        Raises:
+            EOFError: The file holds fewer than count moves.
+        """
+        moves = cls(labels)
+        moves._cars.fromfile(file, count)
+        moves._destinations.fromfile(file, count)
+        return moves
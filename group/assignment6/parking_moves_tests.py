@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+import io
+import unittest
+from parking_moves import CompactMoves
+from parking_state import MoveType
+
+
+class CompactMovesTest(unittest.TestCase):
+    def setUp(self):
+        self.moves = CompactMoves(["", "a", "b", "c"])
+        for move in [(1, 2), (2, 0), (3, 1)]:
+            self.moves.append(move)
+
+    def test_sequence(self):
+        self.assertEqual(len(self.moves), 3)
+        self.assertEqual(self.moves[1], MoveType("b", 0))
+        self.assertEqual(self.moves[-1], ("c", 1))
+        self.assertListEqual(list(self.moves),
+                             [("a", 2), ("b", 0), ("c", 1)])
+        self.assertEqual(self.moves[1:], [("b", 0), ("c", 1)])
+        self.assertIsInstance(self.moves[1:], CompactMoves)
+        self.assertNotEqual(self.moves, [("a", 2)])
+        self.assertRaises(IndexError, self.moves.__getitem__, 3)
+
+    def test_without_labels(self):
+        moves = CompactMoves()
+        moves.append(MoveType(5, 1))
+        self.assertEqual(moves, [(5, 1)])
+        self.assertEqual(moves.nbytes, 2 * moves.cars.itemsize)
+
+    def test_pairs(self):
+        self.assertListEqual(list(self.moves.pairs()),
+                             [("a", 2), ("b", 0), ("c", 1)])
+        moves = CompactMoves()
+        moves.append(MoveType(5, 1))
+        self.assertListEqual(list(moves.pairs()), [(5, 1)])
+
+    def test_buffers(self):
+        cars = self.moves.cars
+        self.assertListEqual(cars.tolist(), [1, 2, 3])
+        self.assertListEqual(self.moves.destinations.tolist(), [2, 0, 1])
+        self.assertRaises(BufferError, self.moves.append, (1, 2))
+        cars.release()
+        self.moves.append((1, 2))
+        self.assertEqual(len(self.moves), 4)
+
+    def test_write(self):
+        output = io.StringIO()
+        self.moves.write(output, chunk_size=2)
+        self.assertEqual(output.getvalue(), "a 2\nb 0\nc 1\n")
+
+    def test_write_binary(self):
+        output = io.BytesIO()
+        self.moves.write_binary(output)
+        output.seek(0)
+        moves = CompactMoves.read_binary(output, 3, self.moves.labels)
+        self.assertEqual(moves, self.moves)
+        output.seek(0)
+        self.assertRaises(EOFError, CompactMoves.read_binary, output, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Keeps a plan of moves up to date while it is executed and its target edited.
+
+Without constraints, the moves of ParkingState.generate_cycle_path resolve
+the cycles of the permutation one at a time: first the cycle of the empty
+slot, then each other cycle, opened by moving one of its cars to the empty
+slot and closed when the empty slot is back in its target position. The
+moves of each cycle, a segment, only depend on the target slots of its own
+cars, so a plan is kept as its segments, with the segment of each slot.
+
+When some slots of the target state change, the cycles of the other slots
+are unchanged, and only the segments of the edited slots are recomputed
+from the current state, in time proportional to the edit and the cycles it
+touches rather than to the lot.
+"""
+
+import collections
+from typing import List, Dict, Iterable, Iterator, Union
+
+from parking_state import ParkingState, CarType, MoveType
+
+
+class CyclePlan:
+    """Implements the remaining moves of a plan to a target, by segments.
+
+    A plan is created by ParkingLot.get_cycle_plan. It iterates over the
+    moves that remain to be executed; execute records the moves done, and
+    replan changes the target state.
+
+    Attributes:
+        labels: The cars of the codes (see ParkingLot).
+    """
+
+    def __init__(self, labels: List[CarType], state: ParkingState,
+                 target_state: ParkingState):
+        """Plans the moves between two encoded states, which it takes over."""
+        self.labels = labels
+        self._codes = {car: code for code, car in enumerate(labels)}
+        self._state = state
+        self._target = target_state
+        self._segments = collections.OrderedDict()
+        self._segment_of = {}  # the segment of each slot it fills
+        self._offset = 0  # the number of executed moves of the first segment
+        self._length = 0
+        self._next_id = 0
+        if len(state):  # an empty lot has no moves, nor an empty slot
+            self._add_segments(range(len(state)), True)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self) -> Iterator[MoveType]:
+        offset = self._offset
+        for segment in self._segments.values():
+            for car, position in segment[offset:]:
+                yield MoveType(self.labels[car], position)
+            offset = 0
+
+    @property
+    def state(self) -> List[CarType]:
+        """Returns the state reached by the executed moves."""
+        return [self.labels[car] for car in self._state.cars]
+
+    @property
+    def target_state(self) -> List[CarType]:
+        """Returns the current target state."""
+        return [self.labels[car] for car in self._target.cars]
+
+    def execute(self, moves: Iterable[MoveType]):
+        """Records that the next moves of the plan were executed.
+
+        Raises:
+            ValueError: The moves are not the next moves of the plan.
+        """
+        for car, position in moves:
+            segment_id, segment = next(iter(self._segments.items()),
+                                       (None, None))
+            if segment is None or (self._codes.get(car), position) != \
+                    segment[self._offset]:
+                raise ValueError(f"Unexpected move: ({car}, {position}). "
+                                 f"Expected the next move of the plan.")
+            self._state._swap_cars_and_pos(self._state._positions[segment[
+                self._offset].car], position)
+            self._offset += 1
+            self._length -= 1
+            if self._offset == len(segment):
+                self._remove_segment(segment_id)
+
+    def replan(self, target_state: Union[List[CarType], Dict[int, CarType]],
+               executed: Iterable[MoveType] = ()):
+        """Changes the target state of the plan after some moves.
+
+        Only the segments of the edited slots are recomputed, unless the
+        empty slot has a new target position, which changes the opening
+        move of every cycle, and then the whole plan is recomputed. The plan
+        remains the shortest one from the current state.
+
+        Args:
+            target_state: The new target state, or the edited slots as a map
+            of <position, new target car>, which avoids comparing the whole
+            target states.
+            executed: The moves executed since the plan was created or last
+            updated (see execute).
+
+        Raises:
+            ValueError: An unexpected executed move (see execute), or a new
+            target state holding other cars.
+        """
+        self.execute(executed)
+        if isinstance(target_state, dict):
+            changes = target_state
+        else:
+            if len(target_state) != len(self._target):
+                raise ValueError(f"States' lengths mismatch, "
+                                 f"{len(self._target)} != {len(target_state)}")
+            changes = {position: car for position, (car, end_code)
+                       in enumerate(zip(target_state, self._target.cars))
+                       if self._codes.get(car) != end_code}
+        self._edit_target(changes)
+        if not changes:
+            return
+
+        empty_target = self._target._positions[0]
+        if empty_target in changes:
+            self._segments.clear()
+            self._segment_of.clear()
+            self._offset = self._length = 0
+            self._add_segments(range(len(self._state)), True)
+            return
+
+        affected = {self._segment_of[position] for position in changes
+                    if position in self._segment_of}
+        first_id = next(iter(self._segments), None)
+        region = set(changes)
+        for segment_id in affected:
+            region.update(position for _, position
+                          in self._segments[segment_id])
+            self._remove_segment(segment_id)
+        region.discard(empty_target)
+        self._add_segments(sorted(region), first_id in affected)
+
+    def _edit_target(self, changes: Dict[int, CarType]):
+        """Sets the target cars of the slots, checking they are permuted.
+
+        Raises:
+            ValueError: The new cars are not the cars of the edited slots.
+        """
+        for position in changes:
+            if not 0 <= position < len(self._target):
+                raise ValueError(f"Out of bounds. {position} not in "
+                                 f"[0, {len(self._target)})")
+        try:
+            codes = {position: self._codes[car]
+                     for position, car in changes.items()}
+        except (KeyError, TypeError):
+            raise ValueError("Unrecognized vehicle(s).") from None
+        if sorted(codes.values()) != sorted(self._target.cars[position]
+                                            for position in codes):
+            raise ValueError(
+                "The two sets of cars are different. Cannot find moves.")
+        for position, code in codes.items():
+            self._target.cars[position] = code
+            self._target._positions[code] = position
+
+    def _add_segments(self, positions: Iterable[int], with_empty: bool):
+        """Plans the segments of the displaced slots among the positions.
+
+        The positions must be a union of cycles of the current permutation.
+        If with_empty, the cycle of the empty slot is among them, and its
+        segment is planned first, and executed before the other segments.
+        """
+        state, target_state = self._state, self._target
+        empty_target = target_state._positions[0]
+        segments = []
+        if with_empty and state._positions[0] != empty_target:
+            segments.append(self._plan_cycle(state._positions[0],
+                                             empty_target))
+        planned = {position for segment in segments for _, position in segment}
+        planned.add(empty_target)
+        for position in positions:
+            if position not in planned and \
+                    state.cars[position] != target_state.cars[position]:
+                segment = self._plan_cycle(position, empty_target)
+                planned.update(position for _, position in segment)
+                segments.append(segment)
+
+        for index, segment in enumerate(segments):
+            segment_id = self._next_id
+            self._next_id += 1
+            self._segments[segment_id] = segment
+            if index == 0 and with_empty:
+                self._segments.move_to_end(segment_id, last=False)
+            for _, position in segment:
+                if position != empty_target:
+                    self._segment_of[position] = segment_id
+            self._length += len(segment)
+
+    def _plan_cycle(self, position: int, empty_target: int) -> List[MoveType]:
+        """Returns the moves resolving the cycle of a slot.
+
+        These are the moves of ParkingState.generate_cycle_path, read from
+        the current state without moving its cars. The cycle of the empty
+        slot is closed by moving the target car of the empty slot there
+        until the empty slot is in its target position. Another cycle is
+        opened by moving the car of the slot to the empty slot, which must
+        be in its target position: the cycle does not hold it, so its cars
+        are in the same slots then.
+        """
+        cars, positions = self._state.cars, self._state._positions
+        first_car = cars[position]
+        if first_car == 0:
+            segment = []
+        else:
+            segment = [MoveType(first_car, empty_target)]
+        while True:
+            car = self._target.cars[position]
+            segment.append(MoveType(car, position))
+            if car == first_car or positions[car] == empty_target:
+                return segment
+            position = positions[car]
+
+    def _remove_segment(self, segment_id: int):
+        """Drops a segment, executed or to be recomputed."""
+        offset = 0
+        if next(iter(self._segments)) == segment_id:
+            offset, self._offset = self._offset, 0
+        segment = self._segments.pop(segment_id)
+        for _, position in segment:
+            if self._segment_of.get(position) == segment_id:
+                del self._segment_of[position]
+        self._length -= len(segment) - offset
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+import random
+import unittest
+from parking_lot import ParkingLot
+
+
+class CyclePlanTest(unittest.TestCase):
+    @staticmethod
+    def _apply(cars, moves):
+        cars = cars.copy()
+        for car, position in moves:
+            assert cars[position] == 0
+            cars[cars.index(car)], cars[position] = 0, car
+        return cars
+
+    def test_same_as_cycles(self):
+        parking_lot = ParkingLot([1, 2, 0, 3])
+        plan = parking_lot.get_cycle_plan([3, 1, 2, 0])
+        self.assertListEqual(list(plan), parking_lot.get_moves(
+            [3, 1, 2, 0], retain_state=True))
+        self.assertEqual(len(plan), 3)
+        self.assertListEqual(parking_lot.state.cars, [1, 2, 0, 3])
+        self.assertRaises(ValueError,
+                          ParkingLot([1, 0], 0, {0: {1}}).get_cycle_plan,
+                          [0, 1])
+
+    def test_empty_lot(self):
+        plan = ParkingLot([]).get_cycle_plan([])
+        self.assertListEqual(list(plan), [])
+        plan.replan([])
+        self.assertEqual(len(plan), 0)
+
+    def test_execute(self):
+        plan = ParkingLot(["a", "b", ""], "").get_cycle_plan(["b", "a", ""])
+        moves = list(plan)
+        plan.execute(moves[:2])
+        self.assertListEqual(list(plan), moves[2:])
+        self.assertListEqual(plan.state, ["b", "", "a"])
+        self.assertRaises(ValueError, plan.execute, [("b", 2)])
+        plan.execute(moves[2:])
+        self.assertEqual(len(plan), 0)
+        self.assertListEqual(plan.state, ["b", "a", ""])
+
+    def test_replan_edited_cycles_only(self):
+        start = list(range(9))
+        target = [0, 2, 1, 4, 3, 6, 5, 8, 7]
+        plan = ParkingLot(start.copy()).get_cycle_plan(target)
+        executed = list(plan)[:2]
+        kept = list(plan)[9:]  # the moves of the cycle (7, 8)
+        plan.replan({3: 6, 5: 4}, executed)
+        self.assertListEqual(plan.target_state,
+                             [0, 2, 1, 6, 3, 4, 5, 8, 7])
+        self.assertListEqual(list(plan)[1:4], kept)
+        current = self._apply(start, executed)
+        self.assertListEqual(self._apply(current, plan),
+                             plan.target_state)
+        self.assertEqual(len(plan), len(ParkingLot(current).get_moves(
+            plan.target_state)))
+
+    def test_replan_random(self):
+        random.seed(4)
+        for _ in range(200):
+            size = random.randint(1, 12)
+            current = list(range(size))
+            target = current.copy()
+            random.shuffle(target)
+            plan = ParkingLot(current.copy()).get_cycle_plan(target)
+            for _ in range(3):
+                executed = list(plan)[:random.randint(0, len(plan))]
+                current = self._apply(current, executed)
+                positions = random.sample(range(size),
+                                          random.randint(0, min(size, 4)))
+                cars = [target[position] for position in positions]
+                random.shuffle(cars)
+                for position, car in zip(positions, cars):
+                    target[position] = car
+                if random.random() < 0.5:
+                    plan.replan(dict(zip(positions, cars)), executed)
+                else:
+                    plan.replan(target.copy(), executed)
+                self.assertListEqual(plan.state, current)
+                self.assertListEqual(self._apply(current, plan), target)
+                self.assertEqual(len(plan), len(ParkingLot(
+                    current.copy()).get_moves(target)))
+
+    def test_invalid_replan(self):
+        plan = ParkingLot([1, 2, 0]).get_cycle_plan([2, 1, 0])
+        self.assertRaises(ValueError, plan.replan, {0: 3})
+        self.assertRaises(ValueError, plan.replan, {0: 1})
+        self.assertRaises(ValueError, plan.replan, {3: 1, 0: 2})
+        self.assertRaises(ValueError, plan.replan, [1, 0])
+        self.assertRaises(ValueError, plan.replan, [2, 1, 0], [(1, 0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
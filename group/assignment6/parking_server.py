@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""Serves parking lot plans over a socket, one JSON request per line.
+
+A long-running server saves each planning job the start of Python and the
+imports. A client sends requests, one JSON object per line:
+
+    {"id": 1, "start": [1, 2, 0, 3], "target": [2, 3, 0, 1],
+     "empty": 0, "constraints": {"2": [3]}, "options": {"mode": "astar"}}
+
+where "empty" (0 by default), "constraints" (a map of position to allowed
+cars) and "options" are optional. The options are "mode" (see
+ParkingLot.get_moves) and "timeout" (seconds, see parking_batch.solve_many,
+only for the searches run by the workers).
+The server answers each request with a line holding its id and either the
+moves (a list of [car, position], or null if there is none) or an error:
+
+    {"id": 1, "moves": [[3, 2], [1, 3], [2, 0], [3, 1]]}
+    {"id": 2, "error": "ValueError: Invalid input, expected one empty slot."}
+
+The requests of a connection are processed concurrently and each response
+is written as soon as it is ready, so the responses may come in another
+order than the requests. The "cycles" plans of lots of at most
+INLINE_MAX_SLOTS slots, which take linear time, are computed in the server;
+the larger plans and the searches, whose time can be exponential, run in a
+pool of worker processes, so a long plan does not delay the others:
+
+    python parking_server.py --port 8765
+    python parking_server.py --unix /tmp/parking.sock
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+from typing import Any, Dict, Optional
+
+from parking_batch import ResultType, describe_error, solve_chunk
+from parking_lot import ParkingLot
+
+# The largest lot whose "cycles" plan is computed in the server, that is in
+# a few milliseconds at most.
+INLINE_MAX_SLOTS = 1000
+
+
+class PlanningServer:
+    """Implements the handling of the connections of the server.
+
+    Attributes:
+        executor: The pool of worker processes running the searches.
+    """
+
+    def __init__(self, workers: int = None):
+        """Creates the pool of workers, os.cpu_count() processes by default."""
+        self.executor = concurrent.futures.ProcessPoolExecutor(workers)
+
+    async def start(self, host: str = None, port: int = None,
+                    path: str = None) -> asyncio.AbstractServer:
+        """Starts serving on a TCP port, or on a Unix socket if path is given.
+
+        Args:
+            host, port: The address to listen on (see asyncio.start_server).
+            path: The path of the Unix socket, if given.
+
+        Returns:
+            The asyncio server, the worker processes are shut down by close.
+        """
+        # The workers are forked at the first job: start them before any
+        # connection is open, otherwise they inherit its socket and keep it
+        # open after the server closes it.
+        await asyncio.get_running_loop().run_in_executor(self.executor, int)
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        """Shuts the worker processes down."""
+        self.executor.shutdown(cancel_futures=True)
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter):
+        """Answers the requests of a connection until the client closes it."""
+        responses = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = asyncio.ensure_future(self._respond(line, writer))
+                responses.add(response)
+                response.add_done_callback(responses.discard)
+            await asyncio.gather(*responses)
+        finally:
+            for response in responses:
+                response.cancel()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:  # the client reset the connection
+                pass
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter):
+        """Processes a request and writes its response line."""
+        response = await self.process(line)
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+
+    async def process(self, line: bytes) -> Dict[str, Any]:
+        """Computes the response of a request line (see the module docstring).
+
+        Returns:
+            The response, with the id of the request (None if it has none)
+            and either its moves or an error.
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise TypeError(f"Unsupported request type: "
+                                f"{type(request).__name__}. Expected object.")
+            request_id = request.get("id")
+            start, target, empty, constraints, options = \
+                self._parse(request)
+            mode, timeout = options.get("mode"), options.get("timeout")
+            if (constraints is None and mode in (None, "cycles")
+                    and len(start) <= INLINE_MAX_SLOTS):
+                moves = ParkingLot(start, empty).get_moves(target, mode=mode)
+                result = ResultType(moves, None)
+            else:
+                loop = asyncio.get_running_loop()
+                result, = await loop.run_in_executor(
+                    self.executor, solve_chunk,
+                    [(start, target, constraints)], empty, mode, timeout)
+        except Exception as error:
+            result = ResultType(None, describe_error(error))
+        if result.error is not None:
+            return {"id": request_id, "error": result.error}
+        return {"id": request_id, "moves": (None if result.moves is None
+                                            else [list(move) for move
+                                                  in result.moves])}
+
+    @staticmethod
+    def _parse(request: Dict[str, Any]):
+        """Extracts the problem of a request, converting the constraints.
+
+        JSON objects have string keys and no sets, so the positions of the
+        constraints are converted to integers and their cars to sets.
+
+        Raises:
+            KeyError: The start or target state is missing.
+            TypeError, ValueError: Invalid constraints or options.
+        """
+        constraints = request.get("constraints")
+        if constraints is not None:
+            if not isinstance(constraints, dict):
+                raise TypeError(f"Unsupported type: {type(constraints)}. "
+                                f"Expected dictionary.")
+            constraints = {int(position): set(cars)
+                           for position, cars in constraints.items()}
+        options = request.get("options") or {}
+        if not isinstance(options, dict):
+            raise TypeError(f"Unsupported options type: {type(options)}. "
+                            f"Expected dictionary.")
+        return (request["start"], request["target"], request.get("empty", 0),
+                constraints, options)
+
+
+async def serve(host: Optional[str], port: Optional[int],
+                path: Optional[str], workers: Optional[int]):
+    """Serves until the process is interrupted (see PlanningServer.start)."""
+    planning_server = PlanningServer(workers)
+    try:
+        server = await planning_server.start(host, port, path)
+        async with server:
+            await server.serve_forever()
+    finally:
+        planning_server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH",
+                        help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int,
+                        help="number of worker processes for the searches")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from parking_lot import ParkingLot
+from parking_server import INLINE_MAX_SLOTS, PlanningServer
+from parking_state import verify_plan
+
+
+class PlanningServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.planning_server = PlanningServer(workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.planning_server.close()
+
+    def _exchange(self, requests, path=None):
+        """Sends the request lines and returns the responses as they come."""
+        async def exchange():
+            server = await self.planning_server.start(
+                "127.0.0.1", 0, path)
+            async with server:
+                if path is None:
+                    port = server.sockets[0].getsockname()[1]
+                    reader, writer = await asyncio.open_connection(
+                        "127.0.0.1", port)
+                else:
+                    reader, writer = await asyncio.open_unix_connection(path)
+                for request in requests:
+                    if not isinstance(request, str):
+                        request = json.dumps(request)
+                    writer.write(request.encode() + b"\n")
+                await writer.drain()
+                writer.write_eof()
+                responses = []
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    responses.append(json.loads(line))
+                writer.close()
+                return responses
+        return asyncio.run(exchange())
+
+    def test_cycles_and_search(self):
+        responses = self._exchange([
+            {"id": 1, "start": [1, 2, 0, 3], "target": [2, 3, 0, 1],
+             "constraints": {"2": [3]}},
+            {"id": 2, "start": ["a", "b", ""], "target": ["b", "a", ""],
+             "empty": ""},
+        ])
+        moves = {response["id"]: response["moves"] for response in responses}
+        self.assertListEqual(moves[1], [[3, 2], [1, 3], [2, 0], [3, 1]])
+        self.assertListEqual(moves[2], [list(move) for move in ParkingLot(
+            ["a", "b", ""], "").get_moves(["b", "a", ""])])
+
+    def test_long_search_does_not_delay_cycles(self):
+        start = list(range(9))
+        target = [0] + start[:0:-1]
+        responses = self._exchange([
+            {"id": "search", "start": start, "target": target,
+             "constraints": {"1": [8, 1]}, "options": {"mode": "astar"}},
+            {"id": "cycles", "start": start, "target": target},
+        ])
+        self.assertListEqual([response["id"] for response in responses],
+                             ["cycles", "search"])
+        self.assertEqual(len(responses[1]["moves"]), 12)
+
+    def test_large_cycles_run_in_workers(self):
+        start = list(range(9))
+        target = [0] + start[:0:-1]
+        large = list(range(INLINE_MAX_SLOTS + 1))
+        large_target = [0] + large[:0:-1]
+        responses = self._exchange([
+            {"id": "search", "start": start, "target": target,
+             "constraints": {"1": [8, 1]}, "options": {"mode": "astar"}},
+            {"id": "large", "start": large, "target": large_target},
+            {"id": "small", "start": start, "target": target},
+        ])
+        # The single worker is busy with the search, the large plan waits.
+        self.assertListEqual([response["id"] for response in responses],
+                             ["small", "search", "large"])
+        self.assertEqual(verify_plan(large, large_target, [
+            tuple(move) for move in responses[2]["moves"]]), (True, None))
+
+    def test_errors(self):
+        responses = self._exchange([
+            "not json",
+            {"id": 1, "start": [1, 2], "target": [2, 1]},
+            {"id": 2, "start": [1, 2, 0], "target": [2, 1, 0],
+             "constraints": {"2": []}},
+            {"id": 3, "target": [0, 1]},
+            {"id": 4, "start": [1, 0], "target": [0, 1], "options": [1]},
+        ])
+        errors = {response["id"]: response.get("error")
+                  for response in responses}
+        self.assertIn("JSONDecodeError", errors[None])
+        self.assertIn("ValueError", errors[1])
+        self.assertIn({"id": 2, "moves": None}, responses)
+        self.assertIn("KeyError", errors[3])
+        self.assertIn("TypeError", errors[4])
+
+    @unittest.skipUnless(hasattr(asyncio, "start_unix_server"),
+                         "Unix sockets are not supported")
+    def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as directory:
+            responses = self._exchange(
+                [{"id": 1, "start": [1, 0], "target": [0, 1]}],
+                os.path.join(directory, "parking.sock"))
+        self.assertListEqual(responses, [{"id": 1, "moves": [[1, 1]]}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,139 @@
 # -*- coding: utf-8 -*-
 """Defines data structures to represent: 
     - a state of a parking lot (ParkingState);
-    - a car; as well as 
-    - a sequence of moves (List[_MoveType]).
+    - a car;
+    - a sequence of moves (List[_MoveType]); as well as
+    - the cars allowed in each slot, compiled from the constraints
+    (FeasibilityType); and
+    - the statistics and the budget of a search (SearchStats); and
+    - the verdict of a replayed plan (VerdictType, see verify_plan).
 """
 
-from typing import List, Set, Dict, Hashable, NamedTuple, Generator, Tuple
+import bisect
+import gc
+import heapq
+import itertools
+import time
+from typing import (List, Set, Dict, Hashable, NamedTuple, Generator, Tuple,
+                    Optional, Sequence, Callable, Any, Iterable)
+
+try:
+    import numpy
+except ImportError:  # large states of integer cars are validated in Python
+    numpy = None
 
 CarType = Hashable
 MoveType = NamedTuple("MoveType", [("car", "CarType"), ("to", int)])
+FeasibilityType = NamedTuple("FeasibilityType",
+                             [("cars", List[Tuple[int, ...]]),
+                              ("masks", List[int])])
+VerdictType = NamedTuple("VerdictType", [("valid", bool),
+                                         ("error", Optional[str])])
+
+# the smallest state of integer cars validated with numpy (if available)
+NUMPY_MIN_SIZE = 1 << 16
+
+
+class BudgetExhausted(Exception):
+    """Raised when a search expands more states or runs longer than allowed.
+
+    Attributes:
+        paths: The paths found before the budget ran out (if the caller
+        collects them).
+    """
+
+    def __init__(self, message: str = "Search budget exhausted.",
+                 paths: List[List["MoveType"]] = None):
+        super().__init__(message)
+        self.paths = paths if paths is not None else []
+
+
+class SearchStats:
+    """Collects the statistics of the searches it is passed to.
+
+    The search engines only update it when given one, so a search without
+    statistics pays a single check per expanded state. It also limits the
+    searches: once max_expanded states were expanded, or the deadline has
+    passed, the next expansion raises BudgetExhausted.
+
+    Attributes:
+        expanded: Number of states whose moves were generated.
+        backtracks: Number of states the depth-first searches returned from
+        after exploring all their moves.
+        peak_seen: Maximal number of states stored at once (the states on the
+        current path of a depth-first search, all the visited states of the
+        A* and breadth-first searches).
+        max_depth: Maximal number of moves from the start (or the target)
+        state to an expanded state.
+        filter_time: Seconds spent selecting the cars allowed to move.
+        paths_yielded: Number of paths found (or counted).
+        callback: Called with the statistics every `every` expanded states,
+        or None.
+        every: Number of expanded states between two calls of callback.
+        max_expanded: Maximal value of expanded, no limit if None.
+        deadline: Maximal value of time.monotonic(), no limit if None.
+
+    Raises:
+        ValueError: every is not positive.
+    """
+
+    def __init__(self, callback: Callable[["SearchStats"], None] = None,
+                 every: int = 1000, max_expanded: int = None,
+                 deadline: float = None):
+        if every < 1:
+            raise ValueError(f"Invalid callback period: {every}. "
+                             f"Expected > 0.")
+        self.max_expanded = max_expanded
+        self.deadline = deadline
+        self.expanded = 0
+        self.backtracks = 0
+        self.peak_seen = 0
+        self.max_depth = 0
+        self.filter_time = 0.0
+        self.paths_yielded = 0
+        self.callback = callback
+        self.every = every
+
+    def __repr__(self):
+        return (f"SearchStats(expanded={self.expanded}, "
+                f"backtracks={self.backtracks}, peak_seen={self.peak_seen}, "
+                f"max_depth={self.max_depth}, "
+                f"filter_time={self.filter_time:.6f}, "
+                f"paths_yielded={self.paths_yielded})")
+
+    def as_dict(self) -> Dict[str, float]:
+        """Returns the statistics (without the callback) as a dictionary."""
+        return {"expanded": self.expanded, "backtracks": self.backtracks,
+                "peak_seen": self.peak_seen, "max_depth": self.max_depth,
+                "filter_time": self.filter_time,
+                "paths_yielded": self.paths_yielded}
+
+    def record_expansion(self, depth: int, seen_size: int,
+                         filter_started: float):
+        """Records an expanded state, once its movable cars were selected.
+
+        Args:
+            depth: Number of moves leading to the state.
+            seen_size: Number of states stored by the search.
+            filter_started: time.perf_counter() before the cars were selected.
+
+        Raises:
+            BudgetExhausted: The state exceeds max_expanded or the deadline.
+        """
+        self.filter_time += time.perf_counter() - filter_started
+        if self.max_expanded is not None and \
+                self.expanded >= self.max_expanded:
+            raise BudgetExhausted(
+                f"Expanded the maximum of {self.max_expanded} states.")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise BudgetExhausted("Deadline exceeded.")
+        self.expanded += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if seen_size > self.peak_seen:
+            self.peak_seen = seen_size
+        if self.callback is not None and self.expanded % self.every == 0:
+            self.callback(self)
 
 
 class ParkingState:
@@ -21,10 +146,46 @@ class ParkingState:
     """
 
     def __init__(self, input_list: List[CarType], empty_slot: CarType = 0):
-        self._validate_state(input_list, empty_slot)
+        # the positions are None if validated with numpy, see _get_positions
+        self._positions, self._summary = self._validate_state(input_list,
+                                                              empty_slot)
         self.cars = input_list
         self.symbol_empty = empty_slot
-        self._positions = {car: index for index, car in enumerate(self.cars)}
+        self._pack = bytes if self._is_packable(input_list) else tuple
+        self._undo_log = None
+        # counts the moves, so that a copy can tell it fell behind (see
+        # ParkingLot._prepare_states)
+        self._mutations = 0
+
+    @classmethod
+    def _from_validated(cls, input_list: List[CarType],
+                        empty_slot: CarType = 0) -> "ParkingState":
+        """Creates a state of cars known to be valid, without validating it.
+
+        E.g. the codes of a validated state (see ParkingLot._encode).
+        """
+        state = cls.__new__(cls)
+        state._positions = {car: index for index, car in enumerate(input_list)}
+        state._summary = None
+        state.cars = input_list
+        state.symbol_empty = empty_slot
+        state._pack = bytes if cls._is_packable(input_list) else tuple
+        state._undo_log = None
+        state._mutations = 0
+        return state
+
+    def _get_positions(self) -> Dict[CarType, int]:
+        """Returns the positions of the cars, building them if needed.
+
+        A state validated with numpy (see `_validate_array`) has no
+        positions until they are first needed. The methods moving the cars
+        build them on entry, the inner ones (e.g. `_swap_cars_and_pos`) read
+        self._positions directly.
+        """
+        if self._positions is None:
+            self._positions = {car: index
+                               for index, car in enumerate(self.cars)}
+        return self._positions
 
     def __len__(self):
         return len(self.cars)
@@ -33,7 +194,19 @@ class ParkingState:
         return self.cars[idx]
 
     @staticmethod
-    def _validate_state(state: List[CarType], symbol_empty: CarType):
+    def _is_packable(cars: List[CarType]) -> bool:
+        """Checks if the states can be stored as bytes instead of tuples.
+
+        It holds for cars encoded as integers (see ParkingLot._encode) in
+        lots of up to 256 slots, where it takes a byte per slot instead of
+        a pointer, and hashing is cheaper.
+        """
+        return len(cars) <= 256 and all(type(car) is int and 0 <= car < 256
+                                        for car in cars)
+
+    @staticmethod
+    def _validate_state(state: List[CarType], symbol_empty: CarType) \
+            -> Tuple[Optional[Dict[CarType, int]], Optional[Tuple[str, Any]]]:
         """Validates if technical and parking state properties hold for input.
 
         This includes:
@@ -42,10 +215,20 @@ class ParkingState:
             3) given the empty slot representation, the input list contains
             exactly one empty slot.
 
+        It takes a single pass, building the positions of the cars, which
+        are kept by the state: there are duplicates if there are fewer
+        positions than cars, and then the empty slot must be present. Large
+        states of integer cars are validated with numpy if it is available
+        (see `_validate_array`), then the positions are built on first use.
+
         Args:
             state: List of cars, where car is a CarType object.
             symbol_empty: Symbol of the empty slot.
 
+        Returns:
+            The positions of the cars, or None if validated with numpy, and
+            the summary of the cars from numpy (see `_same_cars`), or None.
+
         Raises:
             TypeError: Property 1 violated.
             ValueError: Property 2 or 3 violated.
@@ -54,17 +237,77 @@ class ParkingState:
             raise TypeError(f"Unsupported operand type: {type(state)}. "
                             f"Expected list.")
 
-        if len(state) > 0 and state.count(symbol_empty) != 1:
+        array = ParkingState._to_int_array(state, symbol_empty)
+        if array is not None:
+            return None, ParkingState._validate_array(array, symbol_empty)
+
+        positions = {car: index for index, car in enumerate(state)}
+        if len(positions) != len(state) and state.count(symbol_empty) != 1 \
+                or len(state) > 0 and symbol_empty not in positions:
             raise ValueError("Invalid input, expected one empty slot.")
+        if len(positions) != len(state):
+            raise ValueError("Invalid input: duplicate element(s) found.")
+        return positions, None
 
-        if len(state) != len(set(state)):
+    @staticmethod
+    def _to_int_array(state: List[CarType], symbol_empty: CarType):
+        """Returns the numpy array of a large state of integers, or None."""
+        if (numpy is None or len(state) < NUMPY_MIN_SIZE
+                or type(symbol_empty) is not int):
+            return None
+        try:
+            array = numpy.array(state)
+        except (TypeError, ValueError, OverflowError):
+            return None
+        if array.ndim != 1 or array.dtype.kind not in "iu":
+            return None
+        return array
+
+    @staticmethod
+    def _validate_array(array, symbol_empty: int) -> Tuple[str, Any]:
+        """Validates a state of integer cars with vectorized operations.
+
+        The cars are counted (numpy.bincount) if they are in [0, 2N), which
+        is linear, and sorted otherwise.
+
+        Returns:
+            The summary of the cars: ("counts", the count of each car) or
+            ("sorted", the sorted cars).
+
+        Raises:
+            ValueError: Not exactly one empty slot, or duplicate cars.
+        """
+        if numpy.count_nonzero(array == symbol_empty) != 1:
+            raise ValueError("Invalid input, expected one empty slot.")
+        if array.min() >= 0 and array.max() < 2 * len(array):
+            summary = "counts", numpy.bincount(array.astype(numpy.intp))
+            duplicated = summary[1].max() > 1
+        else:
+            summary = "sorted", numpy.sort(array)
+            duplicated = numpy.any(summary[1][1:] == summary[1][:-1])
+        if duplicated:
             raise ValueError("Invalid input: duplicate element(s) found.")
+        return summary
+
+    def _same_cars(self, other: "ParkingState") -> bool:
+        """Checks if two states hold the same cars, reusing their validation.
+
+        The cars are compared through the summaries of the numpy validation
+        if both states have one, and through the positions otherwise, so no
+        set is created. The cars of a state do not change when they move.
+        """
+        if self._summary is not None and other._summary is not None:
+            return (self._summary[0] == other._summary[0] and
+                    numpy.array_equal(self._summary[1], other._summary[1]))
+        return self._get_positions().keys() == other._get_positions().keys()
 
     def generate_all_paths(self, current_moves: List[MoveType],
                            target_state: "ParkingState",
                            displaced_cars: Set[CarType], seen_states,
-                           constraints: Dict[int, Set[CarType]]) \
-            -> Generator[List[MoveType], None, None]:
+                           constraints: FeasibilityType,
+                           path_length: int = None,
+                           stats: SearchStats = None) \
+            -> Generator[List[MoveType], None, bool]:
         """Finds all paths leading from the current state to the target state.
 
         It does not have a single sequence that has the same parking lot
@@ -77,93 +320,857 @@ class ParkingState:
         moving any displaced car into the empty place), see more in the
         `_update_displaced_cars` method.
 
+        The depth-first search keeps an explicit stack of the states on the
+        current path instead of recursing, so the depth of the search is not
+        limited by the recursion limit, and each path is yielded directly.
+
         Args:
             current_moves: A list of moves currently being done.
             target_state: The target arrangement of the cars.
             displaced_cars: A set of cars that are not in their right positions.
             seen_states: A set of states that have already been visited in the
             current path.
-            constraints: A map of constraints telling which cars (values)
-            can be moved to which slots (keys).
+            constraints: The cars allowed in each slot (see
+            compile_constraints).
+            path_length: If given, only the paths of exactly this length are
+            generated, and the states whose minimal count of moves to the
+            target exceeds the remaining length are pruned (see
+            `_count_min_moves`).
+            stats: Collects the statistics of the search if given.
 
         Yields:
             List of car moves (car, target_position).
+
+        Returns:
+            True if some path was cut off at path_length, False otherwise.
         """
-        if not displaced_cars:
-            yield current_moves.copy()
-            return
-
-        state = tuple(self.cars)
-        if state in seen_states:
-            return
-        seen_states.add(state)
-
-        empty_position = self._positions[self.symbol_empty]
-        feasible_cars = self._rearrange_feasible_cars(constraints,
-                                                      empty_position,
-                                                      target_state)
-        for next_car in feasible_cars:
-            if current_moves and current_moves[-1].car == next_car:
-                continue  # a heuristic to not return straight back
-            car_moved_to_target, car_was_in_target \
-                = self._update_displaced_cars(displaced_cars, empty_position,
-                                              next_car, target_state)
-            move = self._swap_cars_and_pos(self._positions[next_car],
-                                           empty_position)
-            current_moves.append(move)
-            empty_position = self._positions[self.symbol_empty]
-            next_moves = self.generate_all_paths(current_moves, target_state,
-                                                 displaced_cars, seen_states,
-                                                 constraints)
-            yield from next_moves
-            self._restore_state(car_moved_to_target,
-                                car_was_in_target,
-                                current_moves,
-                                displaced_cars,
-                                empty_position,
-                                next_car)
-            empty_position = self._positions[self.symbol_empty]
-        seen_states.remove(state)
-
-    def _get_feasible_cars(self, constraints: Dict[int, Set[CarType]],
-                           position_empty: int) -> Set[CarType]:
-        """Returns the set of cars that can be moved to position_empty.
-
-        Args:
-            constraints: A map of constraints, where a constraint is the fact
-            that a certain parking place is reserved only for certain cars.
-            position_empty: Target position (e.g., that of the empty slot).
+        paths = self._walk_paths(current_moves, target_state, displaced_cars,
+                                 seen_states, constraints, path_length, stats)
+        while True:
+            try:
+                path, _ = next(paths)
+            except StopIteration as stop:
+                return stop.value
+            yield path.copy()
+
+    def _walk_paths(self, current_moves: List[MoveType],
+                    target_state: "ParkingState",
+                    displaced_cars: Set[CarType], seen_states,
+                    constraints: FeasibilityType,
+                    path_length: int = None,
+                    stats: SearchStats = None,
+                    frontier_length: int = None,
+                    max_length: int = None) \
+            -> Generator[Tuple[List[MoveType], int], None, bool]:
+        """Runs the search of generate_all_paths without copying the paths.
+
+        Given frontier_length, the moves of that length are also yielded
+        instead of being extended, as the prefixes of the remaining paths.
+        seen_states then holds the states on the prefix but the last one.
+        Given max_length, the paths up to that length are yielded, pruned
+        as those of path_length.
+
+        Yields:
+            current_moves when it is a path, valid until the next step of the
+            generator, and the length of the prefix it shares with the path
+            yielded before (0 for the first one).
+
+        Returns:
+            True if some path was cut off at path_length, False otherwise.
+        """
+        cut_off = False
+        shared = 0
+        bound = path_length if path_length is not None else max_length
+        if bound is not None and len(current_moves) + \
+                self._count_min_moves(self.cars, target_state) > bound:
+            return True
+        positions = self._positions
+        # a frame per state on the current path: its key, the cars that can
+        # be moved to its empty slot and the index of the one to move first
+        # (see `_rearrange_feasible_cars`), the index of the next one to
+        # move, the empty position, its minimal count of moves and cycles
+        # if bounded
+        # (the other states are pruned before moving to them, see
+        # `_get_min_moves_change`), and the move being explored (car, its
+        # position and how it changed displaced_cars), if any
+        stack = []
+        while True:
+            if not displaced_cars:
+                if path_length is None or len(current_moves) == path_length:
+                    if stats is not None:
+                        stats.paths_yielded += 1
+                    yield current_moves, shared
+                    shared = len(current_moves)
+            elif len(current_moves) == frontier_length:
+                yield current_moves, shared
+                shared = len(current_moves)
+            else:
+                state = self._pack(self.cars)
+                if state not in seen_states:
+                    seen_states.add(state)
+                    empty_position = positions[self.symbol_empty]
+                    if stats is None:
+                        feasible_cars, first = self._rearrange_feasible_cars(
+                            constraints, empty_position, target_state)
+                    else:
+                        began = time.perf_counter()
+                        feasible_cars, first = self._rearrange_feasible_cars(
+                            constraints, empty_position, target_state)
+                        stats.record_expansion(len(current_moves),
+                                               len(seen_states), began)
+                    min_moves, cycles = None, None
+                    if bound is not None:
+                        cycles = [None] * len(self.cars)
+                        min_moves = self._count_min_moves(
+                            self.cars, target_state, cycles)
+                    stack.append([state, feasible_cars, first, 0,
+                                  empty_position, min_moves, cycles, None, 0,
+                                  False, False])
+
+            while stack:
+                frame = stack[-1]
+                (state, feasible_cars, first, index, empty_position,
+                 min_moves, cycles, next_car, car_position,
+                 car_moved_to_target, car_was_in_target) = frame
+                if next_car is not None:
+                    self._swap_cars_and_pos(car_position, empty_position)
+                    current_moves.pop()
+                    if len(current_moves) < shared:
+                        shared = len(current_moves)
+                    if car_was_in_target:
+                        displaced_cars.discard(next_car)
+                    elif car_moved_to_target:
+                        displaced_cars.add(next_car)
+                    frame[7] = None
+                if index == len(feasible_cars):
+                    seen_states.remove(state)
+                    stack.pop()
+                    if stats is not None:
+                        stats.backtracks += 1
+                    continue
+                next_car = feasible_cars[first if index == 0 else
+                                         index - 1 if index <= first else
+                                         index]
+                frame[3] = index + 1
+                if current_moves and current_moves[-1].car == next_car:
+                    continue  # a heuristic to not return straight back
+                car_position = positions[next_car]
+                if min_moves is not None and len(current_moves) + 1 + \
+                        min_moves + self._get_min_moves_change(
+                            cycles, target_state, next_car, car_position,
+                            empty_position) > bound:
+                    cut_off = True  # no path within the bound this way
+                    continue
+                frame[7:] = (next_car, car_position) + \
+                    self._update_displaced_cars(displaced_cars,
+                                                empty_position, next_car,
+                                                target_state)
+                current_moves.append(self._swap_cars_and_pos(car_position,
+                                                             empty_position))
+                break
+            else:
+                return cut_off
+
+    def count_paths(self, target_state: "ParkingState",
+                    displaced_cars: Set[CarType], seen_states,
+                    constraints: FeasibilityType,
+                    max_length: int = None,
+                    stats: SearchStats = None) -> int:
+        """Counts the paths generate_all_paths would generate.
+
+        The count of a state depends on the states visited before it, so it
+        cannot be memoized, but nothing is allocated per path: the paths are
+        walked on the explicit stack of the depth-first search, so the depth
+        is not limited by the recursion limit. If max_length is given, the
+        states whose minimal count of moves to the target exceeds the
+        remaining length are pruned (see `_count_min_moves`).
+
+        Args:
+            target_state: The target arrangement of the cars.
+            displaced_cars: A set of cars that are not in their right
+            positions.
+            seen_states: A set of states that have already been visited in the
+            current path.
+            constraints: The cars allowed in each slot (see
+            compile_constraints).
+            max_length: If given, only the paths up to this length are counted.
+            stats: Collects the statistics of the search if given.
+
+        Returns:
+            The number of paths leading from the current state to the target.
+        """
+        return sum(1 for _ in self._walk_paths([], target_state,
+                                               displaced_cars, seen_states,
+                                               constraints, stats=stats,
+                                               max_length=max_length))
+
+    def generate_shortest_path(self, target_state: "ParkingState",
+                               constraints: FeasibilityType,
+                               low_memory: bool = False,
+                               stats: SearchStats = None) \
+            -> Optional[List[MoveType]]:
+        """Finds a shortest path leading from the current state to the target.
+
+        It is an informed search guided by the minimal count of moves of the
+        unconstrained problem (see `_count_min_moves`). Constraints can only
+        remove moves, so the estimate never exceeds the real distance, and
+        the first path found is a shortest one.
+
+        Args:
+            target_state: The target arrangement of the cars.
+            constraints: The cars allowed in each slot (see
+            compile_constraints).
+            low_memory: Uses IDA* (memory linear in the path length) if True,
+            A* (stores every generated state) if False.
+            stats: Collects the statistics of the search if given.
+
+        Returns:
+            List of car moves (car, target_position), or None if the target
+            state cannot be reached.
+        """
+        if low_memory:
+            path = self._iterative_deepening_a_star(target_state, constraints,
+                                                    stats)
+        else:
+            path = self._a_star(target_state, constraints, stats)
+            if path is not None:
+                self._apply_path(path)
+        if path is not None and stats is not None:
+            stats.paths_yielded += 1
+        return path
+
+    def _a_star(self, target_state: "ParkingState",
+                constraints: FeasibilityType, stats: SearchStats = None) \
+            -> Optional[List[MoveType]]:
+        """A* search over immutable states, leaves self unchanged."""
+        start, goal = self._pack(self.cars), self._pack(target_state.cars)
+        parents = {start: None}
+        distances = {start: 0}
+        tie_breaker = itertools.count()
+        frontier = [(self._count_min_moves(start, target_state), 0,
+                     next(tie_breaker), start)]
+        while frontier:
+            _, distance, _, cars = heapq.heappop(frontier)
+            if cars == goal:
+                return self._reconstruct_path(parents, goal)
+            if distance > distances[cars]:
+                continue  # a shorter way to this state was already expanded
+            empty_position = cars.index(self.symbol_empty)
+            if stats is None:
+                feasible_cars = self._get_feasible_cars(constraints,
+                                                        empty_position)
+            else:
+                began = time.perf_counter()
+                feasible_cars = self._get_feasible_cars(constraints,
+                                                        empty_position)
+                stats.record_expansion(distance, len(distances), began)
+            for next_car in feasible_cars:
+                car_position = cars.index(next_car)
+                next_cars = list(cars)
+                next_cars[empty_position], next_cars[car_position] = \
+                    next_car, self.symbol_empty
+                next_cars = self._pack(next_cars)
+                if distances.get(next_cars, distance + 2) <= distance + 1:
+                    continue
+                distances[next_cars] = distance + 1
+                parents[next_cars] = (cars, MoveType(next_car, empty_position))
+                estimate = self._count_min_moves(next_cars, target_state)
+                heapq.heappush(frontier, (distance + 1 + estimate,
+                                          distance + 1, next(tie_breaker),
+                                          next_cars))
+        return None
+
+    @staticmethod
+    def _reconstruct_path(parents, state) -> List[MoveType]:
+        """Follows the (previous state, move) links back to the start state."""
+        path = []
+        while parents[state] is not None:
+            state, move = parents[state]
+            path.append(move)
+        path.reverse()
+        return path
+
+    def _iterative_deepening_a_star(self, target_state: "ParkingState",
+                                    constraints: FeasibilityType,
+                                    stats: SearchStats = None) \
+            -> Optional[List[MoveType]]:
+        """IDA* search, leaves self in the target state if a path is found."""
+        bound = self._count_min_moves(self.cars, target_state)
+        current_moves = []
+        while True:
+            bound = self._bounded_search(current_moves, target_state,
+                                         constraints, bound, stats)
+            if bound is None:
+                return current_moves
+            if bound == float("inf"):
+                return None
+
+    def _bounded_search(self, current_moves: List[MoveType],
+                        target_state: "ParkingState",
+                        constraints: FeasibilityType,
+                        bound: int, stats: SearchStats = None) \
+            -> Optional[float]:
+        """Depth-first search cut off at f = len(path) + estimate > bound.
+
+        It keeps an explicit stack of the states on the current path, as
+        `_walk_paths` does, so the depth is not limited by the recursion
+        limit. The estimate of each expanded state is computed with its
+        cycles, from which the estimate after each move follows (see
+        `_get_min_moves_change`), so the moves beyond the bound are not made.
+
+        Returns:
+            None if the target state was reached (and current_moves holds the
+            path), otherwise the smallest f that exceeded the bound.
+        """
+        cycles = [None] * len(self.cars)
+        estimate = self._count_min_moves(self.cars, target_state, cycles)
+        if estimate == 0:
+            return None
+        if len(current_moves) + estimate > bound:
+            return len(current_moves) + estimate
+
+        next_bound = float("inf")
+        positions = self._positions
+        seen_states = set()
+        state = self._pack(self.cars)
+        # a frame per state on the current path: its key, the cars that can
+        # be moved to its empty slot and the index of the one to move first,
+        # the index of the next one to move, the empty position, its
+        # estimate and cycles, and the position the car being explored came
+        # from, if any
+        stack = []
+        while True:
+            seen_states.add(state)
+            empty_position = positions[self.symbol_empty]
+            if stats is None:
+                feasible_cars, first = self._rearrange_feasible_cars(
+                    constraints, empty_position, target_state)
+            else:
+                began = time.perf_counter()
+                feasible_cars, first = self._rearrange_feasible_cars(
+                    constraints, empty_position, target_state)
+                stats.record_expansion(len(current_moves), len(seen_states),
+                                       began)
+            stack.append([state, feasible_cars, first, 0, empty_position,
+                          estimate, cycles, None])
+
+            while stack:
+                frame = stack[-1]
+                (state, feasible_cars, first, index, empty_position,
+                 estimate, cycles, car_position) = frame
+                if car_position is not None:
+                    self._swap_cars_and_pos(car_position, empty_position)
+                    current_moves.pop()
+                    frame[7] = None
+                if index == len(feasible_cars):
+                    seen_states.remove(state)
+                    stack.pop()
+                    if stats is not None:
+                        stats.backtracks += 1
+                    continue
+                next_car = feasible_cars[first if index == 0 else
+                                         index - 1 if index <= first else
+                                         index]
+                frame[3] = index + 1
+                car_position = positions[next_car]
+                next_estimate = estimate + self._get_min_moves_change(
+                    cycles, target_state, next_car, car_position,
+                    empty_position)
+                if len(current_moves) + 1 + next_estimate > bound:
+                    next_bound = min(next_bound,
+                                     len(current_moves) + 1 + next_estimate)
+                    continue
+                current_moves.append(self._swap_cars_and_pos(car_position,
+                                                             empty_position))
+                if next_estimate == 0:
+                    return None
+                state = self._pack(self.cars)
+                if state in seen_states:
+                    self._swap_cars_and_pos(car_position, empty_position)
+                    current_moves.pop()
+                    continue
+                frame[7] = car_position
+                cycles = [None] * len(self.cars)
+                estimate = self._count_min_moves(self.cars, target_state,
+                                                 cycles)
+                break
+            else:
+                return next_bound
+
+    def generate_bidirectional_path(self, target_state: "ParkingState",
+                                    constraints: FeasibilityType,
+                                    stats: SearchStats = None) \
+            -> Optional[Tuple[List[CarType], List[MoveType]]]:
+        """Finds a shortest path by searching from both ends until they meet.
+
+        Breadth-first searches grow one frontier from the current state and
+        one from the target state, a level at a time, always the smaller one.
+        A move is reversible: a car can return to the slot it came from, as
+        long as it is allowed to stay in its current slot (see
+        `_get_movable_cars`).
+        The depth of each search is halved compared to a single search.
+
+        Args:
+            target_state: The target arrangement of the cars.
+            constraints: The cars allowed in each slot (see
+            compile_constraints).
+            stats: Collects the statistics of the search if given.
+
+        Returns:
+            The state where the two searches met and the list of car moves
+            (car, target_position), or None if the target cannot be reached.
+        """
+        start, goal = self._pack(self.cars), self._pack(target_state.cars)
+        parents = ({start: None}, {goal: None})
+        depths = ({start: 0}, {goal: 0})
+        frontiers = [[start], [goal]]
+        meeting = start if start == goal else None
+        while meeting is None and frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            other = 1 - side
+            next_frontier, meetings = [], []
+            backward = side == 1
+            for cars in frontiers[side]:
+                if stats is None:
+                    movable_cars = self._get_movable_cars(cars, constraints,
+                                                          backward)
+                else:
+                    began = time.perf_counter()
+                    movable_cars = self._get_movable_cars(cars, constraints,
+                                                          backward)
+                    stats.record_expansion(
+                        depths[side][cars],
+                        len(parents[0]) + len(parents[1]), began)
+                for next_cars, move in self._expand(cars, movable_cars,
+                                                    backward):
+                    if next_cars in parents[side]:
+                        continue
+                    parents[side][next_cars] = (cars, move)
+                    depths[side][next_cars] = depths[side][cars] + 1
+                    next_frontier.append(next_cars)
+                    if next_cars in parents[other]:
+                        meetings.append(next_cars)
+            frontiers[side] = next_frontier
+            if meetings:
+                meeting = min(meetings, key=lambda cars: depths[other][cars])
+        if meeting is None:
+            return None
+
+        path = self._reconstruct_path(parents[0], meeting)
+        cars = meeting
+        while parents[1][cars] is not None:
+            cars, move = parents[1][cars]
+            path.append(move)
+        self._apply_path(path)
+        if stats is not None:
+            stats.paths_yielded += 1
+        return list(meeting), path
+
+    def generate_paths_to_many(self, target_states: List["ParkingState"],
+                               constraints: FeasibilityType,
+                               stats: SearchStats = None) \
+            -> List[Optional[List[MoveType]]]:
+        """Finds a shortest path to each target state with a single search.
+
+        A breadth-first search from the current state is shared by all the
+        targets: each state is visited once whichever targets it leads to,
+        and the search stops as soon as every target has been reached. Leaves
+        self unchanged.
+
+        Args:
+            target_states: The target arrangements of the cars.
+            constraints: The cars allowed in each slot (see
+            compile_constraints).
+            stats: Collects the statistics of the search if given.
+
+        Returns:
+            For each target state, the list of car moves (car,
+            target_position), or None if it cannot be reached.
+        """
+        paths = [None] * len(target_states)
+        goals = {}
+        for index, target_state in enumerate(target_states):
+            goals.setdefault(self._pack(target_state.cars), []).append(index)
+        start = self._pack(self.cars)
+        parents = {start: None}
+        frontier = [start]
+        depth = 0
+        while frontier:
+            next_frontier = []
+            for cars in frontier:
+                if cars in goals:
+                    path = self._reconstruct_path(parents, cars)
+                    for index in goals.pop(cars):
+                        paths[index] = path.copy()
+                    if stats is not None:
+                        stats.paths_yielded += 1
+                    if not goals:
+                        return paths
+                if stats is None:
+                    movable_cars = self._get_movable_cars(cars, constraints)
+                else:
+                    began = time.perf_counter()
+                    movable_cars = self._get_movable_cars(cars, constraints)
+                    stats.record_expansion(depth, len(parents), began)
+                for next_cars, move in self._expand(cars, movable_cars):
+                    if next_cars not in parents:
+                        parents[next_cars] = (cars, move)
+                        next_frontier.append(next_cars)
+            frontier = next_frontier
+            depth += 1
+        return paths
+
+    def _get_movable_cars(self, cars: Sequence[CarType],
+                          constraints: FeasibilityType,
+                          backward: bool = False) -> Sequence[CarType]:
+        """Returns the cars that can move from the state cars.
+
+        Forwards, a car allowed in the empty slot is moved there. Backwards,
+        the last move is undone: a car allowed in its current slot returns to
+        the empty slot it came from.
+        """
+        if backward:
+            return [car for position, car in enumerate(cars)
+                    if car != self.symbol_empty and
+                    self._is_allowed(constraints, position, car)]
+        return self._get_feasible_cars(constraints,
+                                       cars.index(self.symbol_empty))
+
+    def _expand(self, cars: Sequence[CarType],
+                movable_cars: Sequence[CarType], backward: bool = False) \
+            -> Generator[Tuple[Sequence[CarType], MoveType], None, None]:
+        """Generates the neighbours of the state cars.
+
+        Args:
+            cars: The state to expand.
+            movable_cars: The cars that can move (see `_get_movable_cars`).
+            backward: Undoes the moves leading to cars if True.
+
+        Yields:
+            The neighbouring state and the move (car, target_position) that
+            leads from the earlier to the later of the two states.
+        """
+        # the searches expanding states are only run on small lots, where
+        # finding a car in the packed state is cheaper than building a dict
+        scratch = list(cars)
+        empty = self.symbol_empty
+        empty_position = cars.index(empty)
+        for car in movable_cars:
+            car_position = cars.index(car)
+            scratch[empty_position], scratch[car_position] = car, empty
+            next_cars = self._pack(scratch)
+            scratch[empty_position], scratch[car_position] = empty, car
+            yield next_cars, MoveType(car, car_position if backward
+                                      else empty_position)
+
+    @staticmethod
+    def _is_allowed(constraints: FeasibilityType, position: int,
+                    car: int) -> bool:
+        """Checks if the car is allowed to park at the position."""
+        return constraints.masks[position] >> car & 1 == 1
+
+    def _apply_path(self, path: List[MoveType]):
+        """Moves the cars along the path (without validation)."""
+        self._get_positions()
+        for move in path:
+            self._swap_cars_and_pos(self._positions[move.car], move.to)
+
+    def apply_moves(self, moves: Iterable[MoveType],
+                    constraints: Dict[int, Set[CarType]] = None,
+                    check_constraints: bool = True) -> int:
+        """Moves the cars along the moves, validating each of them.
+
+        A move (car, position) is valid if the car is in the state (and is
+        not the empty slot), position is the empty slot, and the car is
+        allowed there by the constraints, if they are checked. The moves
+        are replayed in a single pass over the list of cars, keeping only
+        the position of the empty slot and of the moved cars up to date,
+        without creating any object per move.
+
+        Args:
+            moves: An iterable of moves (car, position), e.g. a list or a
+            CompactMoves, whose pairs are read without creating the MoveType
+            objects (see CompactMoves.pairs).
+            constraints: A map of <position, allowed cars for the position>,
+            or None.
+            check_constraints: Checks the constraints if True.
+
+        Returns:
+            The number of applied moves.
+
+        Raises:
+            ValueError: An invalid move, the moves before it are applied.
+        """
+        cars, positions = self.cars, self._get_positions()
+        symbol_empty = self.symbol_empty
+        empty_position = positions.get(symbol_empty)  # None if no slots
+        pairs = getattr(moves, "pairs", None)
+        if pairs is not None:
+            moves = pairs()
+        if not check_constraints:
+            constraints = None
+        record = self._record_swap if self._undo_log is not None else None
+        count = 0
+        try:
+            for car, position in moves:
+                if position != empty_position:
+                    raise ValueError(f"Invalid move {count}: ({car}, "
+                                     f"{position}), slot {position} is not "
+                                     f"empty.")
+                try:
+                    source = positions.get(car)
+                except TypeError:  # an unhashable car
+                    source = None
+                if source is None or car == symbol_empty:
+                    raise ValueError(f"Invalid move {count}: ({car}, "
+                                     f"{position}), unknown car.")
+                if constraints is not None and position in constraints \
+                        and car not in constraints[position]:
+                    raise ValueError(f"Invalid move {count}: ({car}, "
+                                     f"{position}), the car is not allowed "
+                                     f"in slot {position}.")
+                if record is not None:
+                    record(source, position)
+                cars[position] = car
+                cars[source] = symbol_empty
+                positions[car] = position
+                empty_position = source
+                count += 1
+        finally:
+            if count:
+                positions[symbol_empty] = empty_position
+                self._mutations += count
+        return count
+
+    def _count_min_moves(self, cars: Sequence[CarType],
+                         target_state: "ParkingState",
+                         cycles: List[Optional[int]] = None) -> int:
+        """Returns the minimal count of moves from cars to the target state.
+
+        It is exact without constraints, SUM (l_i + 1) over the cycles of the
+        permutation, where the cycle of the empty slot needs one move less
+        per car (see `_update_displaced_cars`), and a lower bound otherwise.
+
+        Args:
+            cars: The arrangement of the cars.
+            target_state: The target arrangement of the cars.
+            cycles: If given, a list of len(cars) None values, set to the
+            first slot of the cycle of each slot (see
+            `_get_min_moves_change`).
+        """
+        if cycles is None:
+            cycles = [None] * len(cars)
+        count = 0
+        for first, car in enumerate(cars):
+            if cycles[first] is not None:
+                continue
+            if car == target_state.cars[first]:
+                cycles[first] = first
+                continue
+            length, has_empty = 0, False
+            position = first
+            while cycles[position] is None:
+                cycles[position] = first
+                length += 1
+                has_empty = has_empty or cars[position] == self.symbol_empty
+                position = target_state._positions[cars[position]]
+            count += length - 1 if has_empty else length + 1
+        return count
+
+    @staticmethod
+    def _get_min_moves_change(cycles: List[int],
+                              target_state: "ParkingState", car: CarType,
+                              car_position: int, empty_position: int) -> int:
+        """Returns how moving a car to the empty slot changes the minimum.
+
+        A move swaps two slots of the permutation, so the minimal count of
+        moves (see `_count_min_moves`) changes by one. It decreases when
+        the move splits the cycle of the empty slot with the car in its
+        target slot, or merges another cycle into it, and increases when it
+        splits it otherwise or moves a car out of its target slot.
+
+        Args:
+            cycles: The cycles of the current state (see `_count_min_moves`).
+            target_state: The target arrangement of the cars.
+            car: The car to move.
+            car_position: The position of the car.
+            empty_position: The position of the empty slot.
+        """
+        if cycles[car_position] == cycles[empty_position]:
+            return -1 if target_state.cars[empty_position] == car else 1
+        return 1 if target_state.cars[car_position] == car else -1
+
+    def generate_cycle_path(self, target_state: "ParkingState",
+                            stats: SearchStats = None,
+                            moves: List[MoveType] = None) -> List[MoveType]:
+        """Computes the shortest sequence of moves without constraints.
+
+        Splits the permutation leading from the current state to the target
+        one into cycles and resolves them one at a time (see the minimal
+        count of moves in `_update_displaced_cars`):
+            1) while the empty slot is not in its target position, the car
+            that belongs to the empty slot is moved there;
+            2) afterwards, every remaining cycle is opened by moving one of
+            its cars to the empty slot and closed by following step 1).
+        Each car is moved at most twice and the slots are scanned once, so
+        it runs in O(N) time and does not recurse.
+
+        Args:
+            target_state: The target arrangement of the cars.
+            stats: Collects the statistics if given, where every state on the
+            path counts as expanded.
+            moves: The list, or any object with an append method (e.g.
+            CompactMoves), that the moves are appended to, a new list if None.
 
         Returns:
-            A set of cars that can be moved to position_empty.
+            moves, with the car moves (car, target_position) appended.
+        """
+        if moves is None:
+            moves = []
+        if self.cars:
+            # The cyclic garbage collector tracks every MoveType (unlike plain
+            # tuples of integers), so it would traverse all the moves made so
+            # far again and again, which takes longer than making them. They
+            # hold no reference cycles, it is paused meanwhile.
+            collecting = gc.isenabled()
+            gc.disable()
+            try:
+                self._walk_cycles(target_state, moves)
+            finally:
+                if collecting:
+                    gc.enable()
+        if stats is not None:
+            stats.expanded += len(moves)
+            stats.max_depth = max(stats.max_depth, len(moves))
+            stats.paths_yielded += 1
+        return moves
+
+    def _walk_cycles(self, target_state: "ParkingState",
+                     moves: List[MoveType]):
+        """Makes the moves of generate_cycle_path, in a single loop.
+
+        The swaps are inlined: each move writes the car to the empty slot and
+        its position, and the empty slot is only written back when a cycle
+        is closed. Only the target position of the empty slot is read from
+        the target state, so its positions are not built.
         """
-        if constraints is not None and position_empty in constraints:
-            return constraints[position_empty] - {self.symbol_empty}
+        cars, positions = self.cars, self._get_positions()
+        symbol_empty = self.symbol_empty
+        target_cars = target_state.cars
+        if target_state._positions is not None:
+            empty_target = target_state._positions[symbol_empty]
         else:
-            return set(self.cars) - {self.symbol_empty}
+            empty_target = target_cars.index(symbol_empty)
+        record = self._record_swap if self._undo_log is not None else None
+        append = moves.append
+        empty_position = positions[symbol_empty]
+        count = 0
+        opened = enumerate(target_cars)
+        while True:
+            # fill the empty slot with its target car until it is in place
+            while empty_position != empty_target:
+                car = target_cars[empty_position]
+                source = positions[car]
+                if record is not None:
+                    record(source, empty_position)
+                cars[empty_position] = car
+                positions[car] = empty_position
+                append(MoveType(car, empty_position))
+                empty_position = source
+                count += 1
+            cars[empty_position] = symbol_empty
+            # open the next cycle by moving one of its cars to the empty slot
+            for position, end_car in opened:
+                if cars[position] != end_car:
+                    break
+            else:
+                break
+            car = cars[position]
+            if record is not None:
+                record(position, empty_position)
+            cars[empty_position] = car
+            positions[car] = empty_position
+            append(MoveType(car, empty_position))
+            empty_position = position
+            count += 1
+        positions[symbol_empty] = empty_position
+        self._mutations += count
+
+    @staticmethod
+    def compile_constraints(constraints: Optional[Dict[int, Set[int]]],
+                            size: int) -> FeasibilityType:
+        """Precomputes the cars allowed in each slot of a lot of encoded cars.
+
+        The cars must be encoded as the integers in [0, size), where 0 is
+        the empty slot (see ParkingLot._encode), and the constraints must be
+        validated (see ParkingLot._validate_constraints). The slots that are
+        not constrained share the same tuple and bitmask.
+
+        Args:
+            constraints: A map of constraints telling which cars (values)
+            can be moved to which slots (keys), or None.
+            size: Number of slots.
+
+        Returns:
+            For each slot, the tuple of cars that can be moved to it, in
+            increasing order, and the bitmask with bit i set if car i is
+            allowed in it (the empty slot is allowed everywhere).
+        """
+        all_cars = tuple(range(1, size))
+        cars = [all_cars] * size
+        masks = [(1 << size) - 1] * size
+        for position, allowed_cars in (constraints or {}).items():
+            cars[position] = tuple(sorted(allowed_cars - {0}))
+            masks[position] = sum(1 << car for car in cars[position]) | 1
+        return FeasibilityType(cars, masks)
 
-    def _rearrange_feasible_cars(self, constraints, empty_position,
-                                 target_state):
-        """Generates cars feasible from the empty slot with the target car first.
+    @staticmethod
+    def _get_feasible_cars(constraints: FeasibilityType,
+                           position_empty: int) -> Tuple[int, ...]:
+        """Returns the cars that can be moved to position_empty.
+
+        Args:
+            constraints: The cars allowed in each slot (see
+            compile_constraints).
+            position_empty: Target position (e.g., that of the empty slot).
+
+        Returns:
+            A tuple of cars that can be moved to position_empty.
+        """
+        return constraints.cars[position_empty]
+
+    def _rearrange_feasible_cars(self, constraints: FeasibilityType,
+                                 empty_position: int,
+                                 target_state: "ParkingState") \
+            -> Tuple[Tuple[int, ...], int]:
+        """Returns cars feasible from the empty slot and which to move first.
 
         A simple heuristic to start generating paths with a smaller number of
-        moves.
+        moves: the target car of the empty slot is moved first, then the
+        others in their order. The tuple of cars is the one shared by the
+        expansions (see compile_constraints), in increasing order, so the
+        target car is found by bisection, and nothing is allocated: the i-th
+        car to move is cars[first] for i == 0, cars[i - 1] for 0 < i <= first
+        and cars[i] after.
 
         Args:
-            constraints: A map of constraints, where a constraint is the fact
-            that a certain parking place is reserved only for certain cars.
+            constraints: The cars allowed in each slot (see
+            compile_constraints).
             empty_position: Index of the empty slot in the current state.
             target_state: Targeted state (arrangement of cars).
 
-        Yields:
-            A car feasible from the empty position where the first element is
-            the target car that must be in the empty slot (if possible).
+        Returns:
+            The tuple of cars feasible from the empty position, and the index
+            in it of the target car that must be in the empty slot, or 0 if
+            that car is not feasible (the order is unchanged then).
         """
-        target_car = target_state[empty_position]
-        feasible_cars = self._get_feasible_cars(constraints, empty_position)
-        if target_car in feasible_cars:
-            yield target_car
-        yield from (car for car in feasible_cars if car != target_car)
+        feasible_cars = constraints.cars[empty_position]
+        target_car = target_state.cars[empty_position]
+        if (target_car == self.symbol_empty
+                or not self._is_allowed(constraints, empty_position,
+                                        target_car)):
+            return feasible_cars, 0
+        return feasible_cars, bisect.bisect_left(feasible_cars, target_car)
 
     def _update_displaced_cars(self, displaced_cars: Set[CarType],
                                empty_pos: int,
@@ -209,22 +1216,78 @@ class ParkingState:
             displaced_cars.remove(next_car)
         return car_moved_to_target, car_was_in_target
 
-    def _restore_state(self, car_moved_to_target, car_was_in_target,
-                       current_moves, displaced_cars, empty_position,
-                       feasible_car):
-        """Restores the state to the previous step while backtracking."""
-        self._swap_cars_and_pos(self._positions[feasible_car],
-                                empty_position)
-        current_moves.pop()
-        if car_was_in_target:
-            displaced_cars.discard(feasible_car)
-        elif car_moved_to_target:
-            displaced_cars.add(feasible_car)
+    def snapshot(self):
+        """Starts recording the swaps, so that rollback can return here.
+
+        Only the swaps that are not undone are kept, so the undo log is as
+        long as the current path rather than the whole search. There is one
+        snapshot at a time, taking a new one discards the previous one.
+        """
+        self._undo_log = []
+
+    def rollback(self):
+        """Returns to the state of the snapshot and stops recording."""
+        undo_log, self._undo_log = self._undo_log, None
+        for x_ind, y_ind in reversed(undo_log):
+            self._swap_cars_and_pos(x_ind, y_ind)
+
+    def release(self):
+        """Stops recording the swaps and keeps the current state."""
+        self._undo_log = None
+
+    def _record_swap(self, x_ind: int, y_ind: int):
+        """Adds a swap to the undo log, or cancels it with the last one."""
+        swap = (x_ind, y_ind) if x_ind < y_ind else (y_ind, x_ind)
+        if self._undo_log and self._undo_log[-1] == swap:
+            self._undo_log.pop()
+        else:
+            self._undo_log.append(swap)
 
     def _swap_cars_and_pos(self, x_ind: int, y_ind: int) -> MoveType:
         """Swaps two elements at the given positions and returns that move."""
+        if self._undo_log is not None:
+            self._record_swap(x_ind, y_ind)
+        self._mutations += 1
         self.cars[x_ind], self.cars[y_ind] = self.cars[y_ind], self.cars[x_ind]
         self._positions[self.cars[x_ind]], self._positions[self.cars[y_ind]] = (
             self._positions[self.cars[y_ind]],
             self._positions[self.cars[x_ind]])
         return MoveType(self.cars[y_ind], y_ind)
+
+
+def verify_plan(start: List[CarType], target: List[CarType],
+                moves: Iterable[MoveType], empty: CarType = 0,
+                constraints: Dict[int, Set[CarType]] = None) -> VerdictType:
+    """Replays the moves from the start state to check they reach the target.
+
+    The moves are validated by ParkingState.apply_moves, which is linear in
+    the number of moves, on a copy of the start state.
+
+    Args:
+        start: The start state (list of cars).
+        target: The target state (list of cars).
+        moves: An iterable of moves (car, position).
+        empty: Object representing the empty slot.
+        constraints: A map of <position, allowed cars for the position>,
+        checked if given.
+
+    Returns:
+        (True, None) if the moves are valid and lead to the target state,
+        (False, the description of the problem) otherwise, e.g. if a move is
+        not a pair (car, position).
+
+    Raises:
+        TypeError, ValueError: See input validation in ParkingState.
+    """
+    state = ParkingState(start.copy(), empty)
+    ParkingState(target, empty)
+    try:
+        count = state.apply_moves(moves, constraints)
+    except ValueError as error:
+        return VerdictType(False, str(error))
+    except TypeError as error:  # e.g. a move is not a pair
+        return VerdictType(False, f"Invalid moves: {error}.")
+    if state.cars != target:
+        return VerdictType(False, f"The {count} moves do not lead to the "
+                                  f"target state.")
+    return VerdictType(True, None)
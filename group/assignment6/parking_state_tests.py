@@ -1,6 +1,9 @@
 #!/usr/bin/python3
+import gc
 import unittest
-from parking_state import ParkingState
+import parking_state
+from parking_state import ParkingState, SearchStats, verify_plan
+from parking_moves import CompactMoves
 
 
 class ParkingStateTest(unittest.TestCase):
@@ -19,6 +22,41 @@ class ParkingStateTest(unittest.TestCase):
     def test_invalid_input_two_empty_slots(self):
         self.assertRaises(ValueError, ParkingState, [1, 2, 0, 0], 0)
 
+    def test_invalid_duplicates_without_empty_slot(self):
+        self.assertRaisesRegex(ValueError, "one empty slot",
+                               ParkingState, [1, 2, 2], 0)
+        self.assertRaisesRegex(ValueError, "duplicate",
+                               ParkingState, [1, 2, 2, 0], 0)
+
+    def test_same_cars(self):
+        state = ParkingState([1, 2, 0, 3])
+        self.assertTrue(state._same_cars(ParkingState([3, 0, 2, 1])))
+        self.assertFalse(state._same_cars(ParkingState([3, 0, 2, 4])))
+
+    def test_positions(self):
+        state = ParkingState._from_validated([2, 0, 1])
+        self.assertDictEqual(state._positions, {2: 0, 0: 1, 1: 2})
+        state._positions = None
+        self.assertDictEqual(state._get_positions(), {2: 0, 0: 1, 1: 2})
+        self.assertRaises(AttributeError, getattr, state, "_missing")
+
+    @unittest.skipUnless(parking_state.numpy, "requires numpy")
+    def test_large_integer_state_validated_with_numpy(self):
+        size = parking_state.NUMPY_MIN_SIZE
+        cars = list(range(size))
+        state = ParkingState(cars)
+        self.assertIsNotNone(state._summary)
+        self.assertIsNone(state._positions)
+        self.assertTrue(state._same_cars(ParkingState(cars[::-1])))
+        self.assertFalse(state._same_cars(ParkingState(cars[:-1] + [-5])))
+        self.assertEqual(state._get_positions()[size - 1], size - 1)
+        self.assertRaisesRegex(ValueError, "duplicate", ParkingState,
+                               cars[:-1] + [1])
+        self.assertRaisesRegex(ValueError, "duplicate", ParkingState,
+                               cars[:-2] + [10 * size] * 2)
+        self.assertRaisesRegex(ValueError, "one empty slot", ParkingState,
+                               cars[1:] + [size])
+
     def test_no_swap(self):
         state1 = ParkingState([1, 2, 3], 1)
         state1._swap_cars_and_pos(0, 0)
@@ -29,5 +67,142 @@ class ParkingStateTest(unittest.TestCase):
         state1._swap_cars_and_pos(1, state1._positions[state1.symbol_empty])
         self.assertEqual(state1.cars, [2, 1, 3])
 
+    def test_cycle_path(self):
+        state = ParkingState([1, 2, 0, 3, 4])
+        moves = state.generate_cycle_path(ParkingState([2, 1, 0, 4, 3]))
+        self.assertListEqual(moves, [(1, 2), (2, 0), (1, 1),
+                                     (3, 2), (4, 3), (3, 4)])
+        self.assertListEqual(state.cars, [2, 1, 0, 4, 3])
+
+    def test_cycle_path_restores_gc(self):
+        target = ParkingState([0, 2, 1])
+        ParkingState([1, 2, 0]).generate_cycle_path(target)
+        self.assertTrue(gc.isenabled())
+        gc.disable()
+        try:
+            ParkingState([1, 2, 0]).generate_cycle_path(target)
+            self.assertFalse(gc.isenabled())
+        finally:
+            gc.enable()
+        self.assertRaises(KeyError, ParkingState([1, 2, 0])
+                          .generate_cycle_path, ParkingState([0, 2, 3]))
+        self.assertTrue(gc.isenabled())
+
+    def test_packed_state_keys(self):
+        self.assertIs(ParkingState([1, 2, 0])._pack, bytes)
+        self.assertIs(ParkingState([1, 0, 300])._pack, tuple)
+        self.assertIs(ParkingState(["a", "b", ""], "")._pack, tuple)
+
+    def test_snapshot_rollback(self):
+        state = ParkingState([1, 2, 0, 3])
+        state.snapshot()
+        state._swap_cars_and_pos(0, 2)
+        state._swap_cars_and_pos(3, 0)
+        state.rollback()
+        self.assertListEqual(state.cars, [1, 2, 0, 3])
+        self.assertEqual(state._positions, {1: 0, 2: 1, 0: 2, 3: 3})
+
+    def test_snapshot_undone_swaps_are_dropped(self):
+        state = ParkingState([1, 2, 0, 3])
+        state.snapshot()
+        state._swap_cars_and_pos(0, 2)
+        state._swap_cars_and_pos(2, 0)
+        state._swap_cars_and_pos(1, 2)
+        self.assertListEqual(state._undo_log, [(1, 2)])
+        state.release()
+        self.assertListEqual(state.cars, [1, 0, 2, 3])
+        self.assertIsNone(state._undo_log)
+
+    def test_compile_constraints(self):
+        feasibility = ParkingState.compile_constraints({1: {0, 3, 1}}, 4)
+        self.assertListEqual(feasibility.cars, [(1, 2, 3), (1, 3), (1, 2, 3),
+                                                (1, 2, 3)])
+        self.assertListEqual(feasibility.masks, [15, 11, 15, 15])
+
+    def test_rearrange_feasible_cars(self):
+        state = ParkingState([1, 2, 0, 3])
+        feasibility = ParkingState.compile_constraints({0: {0, 1, 3}}, 4)
+        target = ParkingState([3, 1, 2, 0])
+        cars, first = state._rearrange_feasible_cars(feasibility, 2, target)
+        self.assertIs(cars, feasibility.cars[2])
+        self.assertEqual(first, 1)  # the order is 2, 1, 3
+        self.assertEqual(
+            state._rearrange_feasible_cars(feasibility, 0, target),
+            ((1, 3), 1))
+        self.assertEqual(
+            state._rearrange_feasible_cars(feasibility, 3, target),
+            ((1, 2, 3), 0))
+
+    def test_search_stats(self):
+        reports = []
+        stats = SearchStats(lambda stats: reports.append(stats.expanded), 2)
+        state = ParkingState([1, 2, 0, 3])
+        feasibility = ParkingState.compile_constraints(None, 4)
+        paths = list(state.generate_all_paths([], ParkingState([3, 1, 2, 0]),
+                                              {1, 2, 3}, set(), feasibility,
+                                              stats=stats))
+        self.assertEqual(stats.paths_yielded, len(paths))
+        self.assertEqual(stats.backtracks, stats.expanded)
+        self.assertEqual(stats.max_depth, max(map(len, paths)) - 1)
+        self.assertEqual(stats.peak_seen, stats.max_depth + 1)
+        self.assertGreaterEqual(stats.filter_time, 0)
+        self.assertListEqual(reports, list(range(2, stats.expanded + 1, 2)))
+        self.assertEqual(stats.as_dict()["expanded"], stats.expanded)
+
+    def test_search_stats_invalid_period(self):
+        self.assertRaises(ValueError, SearchStats, None, 0)
+
+    def test_apply_moves(self):
+        state = ParkingState(["a", "b", "", "c"], "")
+        self.assertEqual(state.apply_moves([("a", 2), ("c", 0)]), 2)
+        self.assertListEqual(state.cars, ["c", "b", "a", ""])
+        self.assertEqual(state._positions, {"a": 2, "b": 1, "c": 0, "": 3})
+
+    def test_apply_invalid_moves(self):
+        state = ParkingState([1, 2, 0, 3])
+        self.assertRaisesRegex(ValueError, "move 1.*not empty",
+                               state.apply_moves, [(1, 2), (3, 2)])
+        self.assertListEqual(state.cars, [0, 2, 1, 3])
+        self.assertEqual(state._positions[0], 0)
+        self.assertRaisesRegex(ValueError, "unknown car", state.apply_moves,
+                               [(4, 0)])
+        self.assertRaisesRegex(ValueError, "unknown car", state.apply_moves,
+                               [(0, 0)])
+        self.assertRaisesRegex(ValueError, "not allowed", state.apply_moves,
+                               [(3, 0)], {0: {2}})
+        self.assertEqual(state.apply_moves([(3, 0)], {0: {2}}, False), 1)
+        self.assertListEqual(state.cars, [3, 2, 1, 0])
+
+    def test_apply_moves_snapshot(self):
+        state = ParkingState([1, 2, 0])
+        state.snapshot()
+        state.apply_moves([(2, 2), (1, 1)])
+        state.rollback()
+        self.assertListEqual(state.cars, [1, 2, 0])
+
+    def test_verify_plan(self):
+        moves = CompactMoves()
+        for move in [(3, 2), (1, 3), (2, 0), (3, 1)]:
+            moves.append(move)
+        self.assertEqual(verify_plan([1, 2, 0, 3], [2, 3, 0, 1], moves,
+                                     0, {2: {3}}), (True, None))
+        valid, error = verify_plan([1, 2, 0, 3], [2, 3, 0, 1], moves, 0,
+                                   {2: {1}})
+        self.assertFalse(valid)
+        self.assertIn("move 0", error)
+        valid, error = verify_plan([1, 2, 0, 3], [2, 3, 0, 1], moves[:3])
+        self.assertFalse(valid)
+        self.assertIn("do not lead", error)
+        self.assertRaises(ValueError, verify_plan, [1, 2, 0], [1, 1, 0], [])
+
+    def test_verify_invalid_moves(self):
+        self.assertEqual(verify_plan([], [], []), (True, None))
+        self.assertFalse(verify_plan([], [], [(1, 0)]).valid)
+        valid, error = verify_plan([1, 0], [0, 1], [([1], 1)])
+        self.assertFalse(valid)
+        self.assertIn("unknown car", error)
+        self.assertFalse(verify_plan([1, 0], [0, 1], [1]).valid)
+
+
 if __name__ == "__main__":
     unittest.main()
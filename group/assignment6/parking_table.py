@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""Precomputes the distances to a target state from every state of a lot.
+
+The cars are labelled by their slots in the target state (as in
+SolutionCache), so the target state is the identity permutation, and a table
+only depends on the number of slots, the label of the empty slot and the
+constraints expressed in labels: it serves every target state with the same
+pattern. A breadth-first search from the target state over the reversed moves
+visits every state that can reach it. For each state, indexed by the Lehmer
+rank of its permutation, the table stores the minimal number of moves to the
+target state and the slot of the car to move first, a byte each, so that a
+shortest sequence of moves is a walk through the table.
+
+A table is written to a file as a JSON header followed by the two arrays,
+and memory-mapped when loaded, so loading it does not read the arrays.
+"""
+
+import json
+import math
+import mmap
+import struct
+from typing import List, Tuple, Dict, Set, Optional, Sequence, BinaryIO
+
+MAGIC = b"PKDT1\n"
+UNREACHABLE = 255
+MAX_SIZE = 9
+
+TableKeyType = Tuple[int, int, Tuple[Tuple[int, Tuple[int, ...]], ...]]
+
+
+class DistanceTable:
+    """Implements a table of distances and first moves to a target state.
+
+    Attributes:
+        size: Number of slots.
+        empty: Label (target slot) of the empty slot.
+        constraints: The labels (values) allowed in each constrained slot
+        (keys), the empty label included.
+    """
+
+    def __init__(self, size: int, empty: int,
+                 constraints: Dict[int, Set[int]],
+                 distances: Sequence[int], next_slots: Sequence[int]):
+        self.size = size
+        self.empty = empty
+        self.constraints = constraints
+        self._distances = distances
+        self._next_slots = next_slots
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def key(self) -> TableKeyType:
+        """Returns the key identifying the problems the table solves."""
+        return self.make_key(self.size, self.empty, self.constraints)
+
+    @staticmethod
+    def make_key(size: int, empty: int,
+                 constraints: Dict[int, Set[int]]) -> TableKeyType:
+        """Returns the key of problems: their size, empty label, constraints.
+
+        Args:
+            size: Number of slots.
+            empty: Label (target slot) of the empty slot.
+            constraints: The labels (values) allowed in each constrained slot
+            (keys), the empty label included.
+        """
+        return size, empty, tuple(sorted(
+            (position, tuple(sorted(labels)))
+            for position, labels in constraints.items()))
+
+    @classmethod
+    def build(cls, size: int, empty: int,
+              constraints: Dict[int, Set[int]]) -> "DistanceTable":
+        """Computes the table by a breadth-first search from the target state.
+
+        Backwards, a move is undone: a car allowed in its current slot
+        returns to the empty slot it came from. The state it leads to is
+        reached from the current one by moving the car from that slot.
+
+        Args:
+            size: Number of slots, at most MAX_SIZE.
+            empty: Label (target slot) of the empty slot.
+            constraints: The labels (values) allowed in each constrained slot
+            (keys), the empty label included.
+
+        Raises:
+            ValueError: Too many slots, or a distance does not fit in a byte.
+        """
+        if not 0 < size <= MAX_SIZE:
+            raise ValueError(f"Invalid table size: {size}. "
+                             f"Expected in [1, {MAX_SIZE}].")
+        target = bytes(range(size))
+        next_slots = {target: UNREACHABLE}
+        distances = {target: 0}
+        frontier = [target]
+        distance = 0
+        while frontier:
+            distance += 1
+            if distance >= UNREACHABLE:
+                raise ValueError("Distances exceed the table capacity.")
+            next_frontier = []
+            for cars in frontier:
+                empty_position = cars.index(empty)
+                for position, car in enumerate(cars):
+                    if car == empty or (position in constraints and
+                                        car not in constraints[position]):
+                        continue
+                    previous_cars = bytearray(cars)
+                    previous_cars[empty_position] = car
+                    previous_cars[position] = empty
+                    previous_cars = bytes(previous_cars)
+                    if previous_cars not in distances:
+                        distances[previous_cars] = distance
+                        next_slots[previous_cars] = empty_position
+                        next_frontier.append(previous_cars)
+            frontier = next_frontier
+
+        distance_array = bytearray([UNREACHABLE]) * math.factorial(size)
+        next_slot_array = bytearray([UNREACHABLE]) * math.factorial(size)
+        for cars, distance in distances.items():
+            rank = cls._rank(cars)
+            distance_array[rank] = distance
+            next_slot_array[rank] = next_slots[cars]
+        return cls(size, empty, constraints, distance_array, next_slot_array)
+
+    @staticmethod
+    def _rank(cars: Sequence[int]) -> int:
+        """Returns the Lehmer rank of a permutation of range(len(cars))."""
+        rank = 0
+        for index, car in enumerate(cars):
+            smaller = 0
+            for other_car in cars[index + 1:]:
+                if other_car < car:
+                    smaller += 1
+            rank = rank * (len(cars) - index) + smaller
+        return rank
+
+    def get_distance(self, cars: Sequence[int]) -> Optional[int]:
+        """Returns the minimal number of moves to the target, None if none.
+
+        Args:
+            cars: The labels of the cars in each slot.
+        """
+        distance = self._distances[self._rank(cars)]
+        return None if distance == UNREACHABLE else distance
+
+    def walk(self, cars: Sequence[int]) -> Optional[List[Tuple[int, int]]]:
+        """Follows the first moves of the table to the target state.
+
+        Args:
+            cars: The labels of the cars in each slot.
+
+        Returns:
+            A shortest list of moves (label, target_position), or None if
+            the target state cannot be reached.
+        """
+        cars = list(cars)
+        rank = self._rank(cars)
+        distance = self._distances[rank]
+        if distance == UNREACHABLE:
+            return None
+        moves = []
+        empty_position = cars.index(self.empty)
+        for _ in range(distance):
+            position = self._next_slots[rank]
+            moves.append((cars[position], empty_position))
+            cars[empty_position], cars[position] = cars[position], self.empty
+            empty_position = position
+            rank = self._rank(cars)
+        return moves
+
+    def save(self, file: BinaryIO):
+        """Writes the header and the arrays of the table to a binary file."""
+        header = json.dumps({
+            "size": self.size, "empty": self.empty,
+            "constraints": [[position, labels] for position, labels
+                            in self.key[2]]}).encode()
+        file.write(MAGIC)
+        file.write(struct.pack("<I", len(header)))
+        file.write(header)
+        file.write(self._distances)
+        file.write(self._next_slots)
+
+    @classmethod
+    def load(cls, path: str) -> "DistanceTable":
+        """Memory-maps a table written by save, close it once unused.
+
+        Raises:
+            ValueError: The file is not a complete table.
+        """
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if mapped[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"Not a distance table: {path}.")
+            offset = len(MAGIC) + 4
+            header_length, = struct.unpack("<I", mapped[len(MAGIC):offset])
+            header = json.loads(mapped[offset:offset + header_length])
+            offset += header_length
+            count = math.factorial(header["size"])
+            if len(mapped) != offset + 2 * count:
+                raise ValueError(f"Truncated distance table: {path}.")
+        except BaseException:
+            mapped.close()
+            raise
+        view = memoryview(mapped)
+        table = cls(header["size"], header["empty"],
+                    {position: set(labels)
+                     for position, labels in header["constraints"]},
+                    view[offset:offset + count],
+                    view[offset + count:offset + 2 * count])
+        table._mmap = mapped
+        return table
+
+    def close(self):
+        """Releases the memory-mapped file of a loaded table."""
+        if self._mmap is not None:
+            self._distances.release()
+            self._next_slots.release()
+            self._mmap.close()
+            self._mmap = None
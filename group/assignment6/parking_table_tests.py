@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+import itertools
+import os
+import tempfile
+import unittest
+from parking_lot import ParkingLot
+from parking_table import DistanceTable, MAX_SIZE
+
+
+class DistanceTableTest(unittest.TestCase):
+    def test_distances_are_shortest(self):
+        constraints = {0: {1, 2}, 3: {3, 0}}
+        target = [2, 1, 0, 3, 4]
+        table = ParkingLot(target.copy(), 0, constraints) \
+            .build_distance_table(target)
+        for start in itertools.permutations(target):
+            parking_lot = ParkingLot(list(start), 0, constraints)
+            moves = parking_lot.get_moves(target, retain_state=True,
+                                          mode="astar")
+            distance = table.get_distance(
+                [target.index(car) for car in start])
+            if moves is None:
+                self.assertIsNone(distance)
+            else:
+                self.assertEqual(distance, len(moves))
+
+    def test_walk_reaches_target(self):
+        table = DistanceTable.build(4, 2, {1: {1, 2}})
+        self.assertListEqual(table.walk([0, 1, 2, 3]), [])
+        self.assertIsNone(DistanceTable.build(3, 0, {1: {0}}).walk([0, 2, 1]))
+        cars = [3, 1, 0, 2]
+        moves = table.walk(cars)
+        self.assertEqual(len(moves), table.get_distance(cars))
+        for car, position in moves:
+            self.assertEqual(cars[position], 2)
+            self.assertTrue(position != 1 or car in (1, 2))
+            cars[cars.index(car)], cars[position] = 2, car
+        self.assertListEqual(cars, [0, 1, 2, 3])
+
+    def test_save_and_load(self):
+        table = DistanceTable.build(5, 0, {4: {0, 1, 4}})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.bin")
+            with open(path, "wb") as file:
+                table.save(file)
+            with DistanceTable.load(path) as loaded:
+                self.assertEqual(loaded.key, table.key)
+                for cars in itertools.permutations(range(5)):
+                    self.assertEqual(loaded.walk(cars), table.walk(cars))
+
+    def test_invalid_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "table.bin")
+            with open(path, "wb") as file:
+                file.write(b"not a table")
+            self.assertRaises(ValueError, DistanceTable.load, path)
+
+    def test_invalid_size(self):
+        self.assertRaises(ValueError, DistanceTable.build, 0, 0, {})
+        self.assertRaises(ValueError, DistanceTable.build, MAX_SIZE + 1, 0,
+                          {})
+        self.assertRaises(ValueError, ParkingLot([]).build_distance_table, [])
+        self.assertRaises(ValueError,
+                          ParkingLot(list(range(MAX_SIZE + 1)))
+                          .build_distance_table, list(range(MAX_SIZE + 1)))
+
+    def test_lot_walks_table(self):
+        constraints = {0: {1, 2}, 3: {3, 0}}
+        target = [2, 1, 0, 3, 4]
+        parking_lot = ParkingLot([1, 2, 0, 3, 4], 0, constraints)
+        table = parking_lot.build_distance_table(target)
+        parking_lot.add_distance_table(table)
+        moves = parking_lot.get_moves(target)
+        self.assertListEqual(
+            moves, [(target[car], position) for car, position
+                    in table.walk([1, 0, 2, 3, 4])])
+        self.assertListEqual(parking_lot.state.cars, target)
+        # the same pattern, relabelled
+        relabelled = ParkingLot(["a", "b", "", "c", "d"], "",
+                                {0: {"a", "b"}, 3: {"c", ""}})
+        relabelled.add_distance_table(table)
+        self.assertListEqual(
+            relabelled.get_moves(["b", "a", "", "c", "d"]),
+            [(["b", "a", "", "c", "d"][target.index(car)], position)
+             for car, position in moves])
+        self.assertRaises(ValueError, parking_lot.add_distance_table,
+                          DistanceTable.build(4, 0, {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
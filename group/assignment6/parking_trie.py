@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Stores a set of paths as a trie of moves sharing their common prefixes.
+
+The paths of an exhaustive search share long prefixes: the depth-first
+search only changes the end of the current path between two paths. Stored
+as lists, each path costs its full length; in a trie, a path only costs the
+moves after the prefix it shares with the paths stored before it. The paths
+are recreated (as lists of moves) one at a time when iterating.
+"""
+
+import array
+from typing import List, Iterator, Sequence
+
+from parking_state import CarType, MoveType
+
+NO_NODE = -1
+
+
+class PathTrie:
+    """Implements a trie of moves of integer cars, stored in flat arrays.
+
+    Each node but the root holds a move (car, position), and each path from
+    the root to a terminal node is a stored path. The nodes are indices into
+    parallel arrays, so a node takes a few machine words rather than a
+    MoveType and a list slot per path going through it.
+
+    Attributes:
+        labels: The cars of the integer cars of the moves (e.g. the codes of
+        ParkingLot), used when iterating, or None to keep the integers.
+    """
+
+    ROOT = 0
+
+    def __init__(self, labels: Sequence[CarType] = None):
+        self.labels = labels
+        self._cars = array.array("l", [NO_NODE])
+        self._destinations = array.array("l", [NO_NODE])
+        self._parents = array.array("l", [NO_NODE])
+        self._first_children = array.array("l", [NO_NODE])
+        self._last_children = array.array("l", [NO_NODE])
+        self._next_siblings = array.array("l", [NO_NODE])
+        self._terminal = bytearray(1)
+        self._path_nodes = [self.ROOT]  # the nodes of the last inserted path
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def node_count(self) -> int:
+        """Returns the number of stored moves (nodes other than the root)."""
+        return len(self._cars) - 1
+
+    def insert(self, path: Sequence[MoveType], shared: int = None):
+        """Adds a path of moves of integer cars.
+
+        Args:
+            path: A sequence of moves (car, position).
+            shared: The length of the prefix the path shares with the path
+            inserted before it, if known (see ParkingState._walk_paths). Then
+            the new moves are appended without looking for existing ones, so
+            it must also be the longest prefix of the path in the trie.
+        """
+        path_nodes = self._path_nodes
+        if shared is None:
+            shared = 0
+            del path_nodes[1:]
+            for car, destination in path:
+                node = self._find_child(path_nodes[-1], car, destination)
+                if node == NO_NODE:
+                    break
+                path_nodes.append(node)
+                shared += 1
+        elif shared >= len(path_nodes):
+            raise ValueError(f"Invalid shared prefix: {shared}. Expected < "
+                             f"{len(path_nodes)}.")
+        else:
+            del path_nodes[shared + 1:]
+        node = path_nodes[-1]
+        for index in range(shared, len(path)):
+            car, destination = path[index]
+            node = self._add_child(node, car, destination)
+            path_nodes.append(node)
+        if not self._terminal[node]:
+            self._terminal[node] = 1
+            self._size += 1
+
+    def _find_child(self, node: int, car: int, destination: int) -> int:
+        """Returns the child of the node holding the move, or NO_NODE."""
+        child = self._first_children[node]
+        while child != NO_NODE and (self._cars[child] != car or
+                                    self._destinations[child] != destination):
+            child = self._next_siblings[child]
+        return child
+
+    def _add_child(self, node: int, car: int, destination: int) -> int:
+        """Appends a child holding the move to the node and returns it."""
+        child = len(self._cars)
+        self._cars.append(car)
+        self._destinations.append(destination)
+        self._parents.append(node)
+        self._first_children.append(NO_NODE)
+        self._last_children.append(NO_NODE)
+        self._next_siblings.append(NO_NODE)
+        self._terminal.append(0)
+        if self._last_children[node] == NO_NODE:
+            self._first_children[node] = child
+        else:
+            self._next_siblings[self._last_children[node]] = child
+        self._last_children[node] = child
+        return child
+
+    def __iter__(self) -> Iterator[List[MoveType]]:
+        """Generates the paths, each as a new list, in depth-first order.
+
+        Children are visited in insertion order, so the paths of a
+        depth-first search come out in the order they were found.
+        """
+        if self._terminal[self.ROOT]:
+            yield []
+        path = []
+        node = self._first_children[self.ROOT]
+        while node != NO_NODE:
+            path.append(self._get_move(node))
+            if self._terminal[node]:
+                yield path.copy()
+            if self._first_children[node] != NO_NODE:
+                node = self._first_children[node]
+                continue
+            while True:  # backtracks to the closest node with a next sibling
+                path.pop()
+                if self._next_siblings[node] != NO_NODE:
+                    node = self._next_siblings[node]
+                    break
+                node = self._parents[node]
+                if node == self.ROOT:
+                    node = NO_NODE
+                    break
+
+    def _get_move(self, node: int) -> MoveType:
+        """Returns the move of the node, with its car label if any."""
+        car = self._cars[node]
+        return MoveType(car if self.labels is None else self.labels[car],
+                        self._destinations[node])
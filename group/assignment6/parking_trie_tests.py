@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+import unittest
+from parking_state import MoveType
+from parking_trie import PathTrie
+
+
+class PathTrieTest(unittest.TestCase):
+    def test_empty_trie(self):
+        trie = PathTrie()
+        self.assertEqual(len(trie), 0)
+        self.assertEqual(trie.node_count, 0)
+        self.assertListEqual(list(trie), [])
+
+    def test_shared_prefixes_stored_once(self):
+        trie = PathTrie()
+        trie.insert([(1, 2), (2, 0)])
+        trie.insert([(1, 2), (3, 0), (1, 1)])
+        trie.insert([(1, 2), (3, 0), (2, 3)])
+        trie.insert([(2, 2)])
+        self.assertEqual(len(trie), 4)
+        self.assertEqual(trie.node_count, 6)
+        self.assertListEqual(list(trie), [[(1, 2), (2, 0)],
+                                          [(1, 2), (3, 0), (1, 1)],
+                                          [(1, 2), (3, 0), (2, 3)],
+                                          [(2, 2)]])
+
+    def test_insert_with_shared_length(self):
+        paths = [[(1, 2), (2, 0)], [(1, 2), (3, 0), (1, 1)],
+                 [(1, 2), (3, 0), (2, 3)], [(2, 2)]]
+        trie = PathTrie()
+        for path, shared in zip(paths, (0, 1, 2, 0)):
+            trie.insert(path, shared)
+        self.assertEqual(trie.node_count, 6)
+        self.assertListEqual(list(trie), paths)
+        self.assertRaises(ValueError, trie.insert, [(1, 2), (2, 0)], 2)
+
+    def test_duplicates_and_empty_path(self):
+        trie = PathTrie()
+        trie.insert([(1, 2), (2, 0)])
+        trie.insert([(1, 2), (2, 0)])
+        trie.insert([])
+        self.assertEqual(len(trie), 2)
+        self.assertListEqual(list(trie), [[], [(1, 2), (2, 0)]])
+
+    def test_labels(self):
+        trie = PathTrie(["", "a", "b"])
+        trie.insert([(1, 2), (2, 0)])
+        path = next(iter(trie))
+        self.assertListEqual(path, [("a", 2), ("b", 0)])
+        self.assertIsInstance(path[0], MoveType)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""Schedules the moves of a lot with several empty slots in parallel rounds.
+
+ParkingLot has a single empty slot, so its cars move one at a time. With k
+empty slots, up to k cars can move at the same time: in a round, each car
+moves to a distinct slot that is empty when the round starts. ParkingYard
+plans a schedule of such rounds, trying to minimize their number (the time
+the rearrangement takes) rather than the number of moves.
+
+Seen as slots, the displaced cars form chains and cycles: each car waits for
+its target slot, held by the next car of the chain, and a chain ends with a
+car whose target slot is empty, which can move at once. A chain of m cars
+takes m rounds, a cycle must first move one of its cars to a spare empty
+slot (one that is empty in the target state). Moving cars aside splits a
+chain or cycle into pieces that proceed in parallel (see `_count_rounds`).
+The schedule is greedy: in each round, every car whose target slot is empty
+moves there, and each spare slot takes a car of the chain or cycle that
+takes the most rounds, where moving it aside saves the most rounds (see
+`_place_car_aside`). It is a heuristic, which can take more rounds than the
+shortest schedule, mostly with constraints.
+"""
+
+import bisect
+from typing import List, Set, Dict, Optional, Tuple
+
+from parking_state import CarType, MoveType
+
+RoundType = List[MoveType]
+
+
+class ParkingYard:
+    """Implements a parking lot of N slots with k >= 1 empty slots.
+
+    Attributes:
+        cars: Ordered list of cars/empty slots, the current state.
+        empty: Object representing the empty slots, used in cars.
+        constraints: A map of <position, allowed cars for the position>.
+
+    Raises:
+        TypeError, ValueError: See input validation in `_validate_state` and
+        `_validate_constraints`.
+    """
+
+    def __init__(self, start: List[CarType], empty: CarType = 0,
+                 constraints: Dict[int, Set[CarType]] = None):
+        self._validate_state(start, empty)
+        self.cars = start
+        self.empty = empty
+        if constraints is not None:
+            self._validate_constraints(constraints)
+        self.constraints = constraints
+
+    def __len__(self):
+        return len(self.cars)
+
+    @staticmethod
+    def _validate_state(state: List[CarType], symbol_empty: CarType):
+        """Validates a state: a list with empty slots and no duplicate cars.
+
+        Raises:
+            TypeError: The state is not a list.
+            ValueError: There is no empty slot, or a duplicate car.
+        """
+        if not isinstance(state, list):
+            raise TypeError(f"Unsupported operand type: {type(state)}. "
+                            f"Expected list.")
+        empty_count = state.count(symbol_empty)
+        if empty_count == 0:
+            raise ValueError("Invalid input, expected an empty slot.")
+        if len(set(state)) != len(state) - empty_count + 1:
+            raise ValueError("Invalid input: duplicate element(s) found.")
+
+    def _validate_constraints(self, constraints: Dict[int, Set[CarType]]):
+        """Validates the constraints as ParkingLot does.
+
+        Raises:
+            TypeError: Not a dictionary of <int, set> pairs.
+            ValueError: A position out of bounds, or an unknown car.
+        """
+        if not isinstance(constraints, dict):
+            raise TypeError(f"Unsupported type: {type(constraints)}. "
+                            f"Expected dictionary.")
+        for position, cars in constraints.items():
+            if not isinstance(position, int):
+                raise TypeError(f"Unsupported position type: "
+                                f"{type(position)}. Expected int.")
+            if not isinstance(cars, set):
+                raise TypeError(f"Unsupported cars type: {type(cars)}. "
+                                f"Expected set.")
+            if not 0 <= position < len(self):
+                raise ValueError(
+                    f"Out of bounds. {position} not in [0, {len(self)})")
+            if not cars <= set(self.cars):
+                raise ValueError("Unrecognized vehicle(s).")
+
+    def _validate_target(self, target_state: List[CarType]):
+        """Validates that the target state holds the cars of the yard.
+
+        Raises:
+            TypeError, ValueError: An invalid target state, other cars, or a
+            car in a slot where it is not allowed.
+        """
+        self._validate_state(target_state, self.empty)
+        if len(target_state) != len(self):
+            raise ValueError(f"States' lengths mismatch, {len(self)} != "
+                             f"{len(target_state)}")
+        if set(target_state) != set(self.cars):
+            raise ValueError(
+                "The two sets of cars are different. Cannot find moves.")
+        for position, car in enumerate(target_state):
+            if car != self.empty and not self._is_allowed(car, position):
+                raise ValueError("Found contradiction between constraints "
+                                 "and target state.")
+
+    def _is_allowed(self, car: CarType, position: int) -> bool:
+        """Checks if the car may park in the slot."""
+        return (self.constraints is None or position not in self.constraints
+                or car in self.constraints[position])
+
+    def get_rounds(self, target_state: List[CarType],
+                   retain_state: bool = False) -> Optional[List[RoundType]]:
+        """Computes a schedule of rounds of moves to the target state.
+
+        The moves of a round can be done at the same time, or one after
+        another in any order. Each car moved aside to a spare slot costs one
+        move more than with a single empty slot.
+        With constraints, a car is only moved aside to a spare slot where it
+        is allowed, and the schedule is not searched: None is returned if it
+        gets stuck, even if some schedule exists.
+
+        Args:
+            target_state: Targeted state (arrangement of cars).
+            retain_state: Retains self.cars unchanged if True, sets it to
+            target_state if False.
+
+        Returns:
+            The list of rounds, each a list of moves (car, position) of
+            distinct cars to distinct slots, or None if no schedule was found.
+
+        Raises:
+            TypeError, ValueError: See `_validate_target`.
+        """
+        self._validate_target(target_state)
+        cars = self.cars.copy()
+        positions = {car: position for position, car in enumerate(cars)
+                     if car != self.empty}
+        empties = {position for position, car in enumerate(cars)
+                   if car == self.empty}
+        displaced = {car for car, position in positions.items()
+                     if target_state[position] != car}
+
+        rounds = []
+        while displaced:
+            moves = self._schedule_round(target_state, cars, positions,
+                                         empties, displaced)
+            if not moves:
+                return None
+            for car, position in moves:
+                empties.add(positions[car])
+                cars[positions[car]] = self.empty
+            for car, position in moves:
+                empties.remove(position)
+                cars[position] = car
+                positions[car] = position
+                if target_state[position] == car:
+                    displaced.remove(car)
+                else:
+                    displaced.add(car)
+            rounds.append(moves)
+        if not retain_state:
+            self.cars = cars
+        return rounds
+
+    def get_moves(self, target_state: List[CarType],
+                  retain_state: bool = False) -> Optional[List[MoveType]]:
+        """Computes the moves of get_rounds, one round after another."""
+        rounds = self.get_rounds(target_state, retain_state)
+        if rounds is None:
+            return None
+        return [move for moves in rounds for move in moves]
+
+    def _schedule_round(self, target_state: List[CarType],
+                        cars: List[CarType], positions: Dict[CarType, int],
+                        empties: Set[int], displaced: Set[CarType]) \
+            -> RoundType:
+        """Chooses the moves of the next round (see the module docstring)."""
+        moves = []
+        spares = []
+        for position in sorted(empties):
+            car = target_state[position]
+            if car == self.empty:
+                spares.append(position)
+            else:  # the car is displaced, as its target slot is empty
+                moves.append(MoveType(car, position))
+        if not spares:
+            return moves
+
+        components = self._find_components(target_state, cars, positions,
+                                           moves, displaced)
+        # the spare slot of each car aside, by its index in the component
+        asides = [{} for _ in components]
+        for spare in spares:
+            # by decreasing number of rounds, the cycles first, then longest
+            order = sorted(range(len(components)), reverse=True,
+                           key=lambda index: (self._count_rounds(
+                               *components[index], sorted(asides[index])),
+                               len(components[index][1])))
+            for index in order:
+                aside = self._place_car_aside(*components[index],
+                                              asides[index], spare)
+                if aside is not None:
+                    asides[index] = aside
+                    break
+        for (_, component), aside in zip(components, asides):
+            moves.extend(MoveType(component[index], spare)
+                         for index, spare in sorted(aside.items()))
+        return moves
+
+    def _find_components(self, target_state: List[CarType],
+                         cars: List[CarType], positions: Dict[CarType, int],
+                         moves: RoundType, displaced: Set[CarType]) \
+            -> List[Tuple[bool, List[CarType]]]:
+        """Returns the chains and cycles of the displaced cars.
+
+        A chain starts with a car moving to its empty target slot, followed
+        by the car whose target slot it leaves, and so on. A cycle starts
+        with any of its cars.
+
+        Returns:
+            A list of (is_cycle, cars) tuples.
+        """
+        components = []
+        visited = set()
+        for car, _ in moves:
+            chain = []
+            while car != self.empty:
+                chain.append(car)
+                visited.add(car)
+                car = target_state[positions[car]]
+            components.append((False, chain))
+        for car in cars:
+            if car not in displaced or car in visited:
+                continue
+            cycle = []
+            while car not in visited:
+                cycle.append(car)
+                visited.add(car)
+                car = target_state[positions[car]]
+            components.append((True, cycle))
+        return components
+
+    @staticmethod
+    def _count_rounds(is_cycle: bool, component: List[CarType],
+                      cuts: List[int]) -> float:
+        """Returns the rounds a component takes with some cars moved aside.
+
+        In a chain, the car of index j (from 0) moves in round j + 1, when
+        the car before it left its target slot. Moving the car of index c
+        aside in the first round frees its slot, so the cars after it start
+        in round 2, and it returns to its target slot once the car before
+        it left. The cars aside split the chain, or the cycle, into pieces
+        that proceed in parallel: the piece after c up to the next car aside
+        c' takes c' - c + 1 rounds, the piece of a chain up to its first car
+        aside c takes c + 1 rounds, and the piece after its last one m - c.
+
+        Args:
+            is_cycle: Whether the component is a cycle or a chain.
+            component: Its cars (see `_find_components`).
+            cuts: The sorted indices of the cars moved aside.
+
+        Returns:
+            The number of rounds, infinite for a cycle without a car aside.
+        """
+        length = len(component)
+        if not cuts:
+            return float("inf") if is_cycle else length
+        rounds = [cut - previous + 1 for previous, cut in zip(cuts, cuts[1:])]
+        if is_cycle:
+            rounds.append(cuts[0] + length - cuts[-1] + 1)
+        else:
+            rounds += [cuts[0] + 1, length - cuts[-1]]
+        return max(rounds)
+
+    def _place_car_aside(self, is_cycle: bool, component: List[CarType],
+                         aside: Dict[int, int], spare: int) \
+            -> Optional[Dict[int, int]]:
+        """Moves one more car of a component aside, to the spare slot.
+
+        Without constraints, the cars aside are spread evenly (see
+        `_spread_cuts`), which places them anew. With constraints, the cars
+        already aside stay, and the car allowed in the spare slot that saves
+        the most rounds is added (see `_choose_car_aside`).
+
+        Args:
+            is_cycle: Whether the component is a cycle or a chain.
+            component: Its cars (see `_find_components`).
+            aside: The spare slot of each car already aside, by its index.
+            spare: The spare slot.
+
+        Returns:
+            The new map of <index of a car aside, its spare slot>, or None if
+            no car saves a round.
+        """
+        rounds = self._count_rounds(is_cycle, component, sorted(aside))
+        if self.constraints is None:
+            cuts = self._spread_cuts(is_cycle, len(component), len(aside) + 1)
+            if self._count_rounds(is_cycle, component, cuts) >= rounds:
+                return None
+            return dict(zip(cuts, list(aside.values()) + [spare]))
+        index = self._choose_car_aside(is_cycle, component, sorted(aside),
+                                       spare)
+        if index is None:
+            return None
+        return {**aside, index: spare}
+
+    @staticmethod
+    def _spread_cuts(is_cycle: bool, length: int, count: int) -> List[int]:
+        """Returns the indices of count cars aside taking the fewest rounds.
+
+        Count cars aside split a cycle of m cars into pieces of at most
+        ceil(m / count) cars, which take one round more, and a chain into
+        pieces taking at most ceil((m + count) / (count + 1)) rounds (see
+        `_count_rounds`). Fewer indices are returned if more would not save
+        rounds.
+        """
+        if is_cycle:
+            step = -(-length // count)
+            return list(range(0, length, step))[:count]
+        step = max(-(-(length + count) // (count + 1)) - 1, 1)
+        return list(range(step, length, step))[:count]
+
+    def _choose_car_aside(self, is_cycle: bool, component: List[CarType],
+                          cuts: List[int], spare: int) -> Optional[int]:
+        """Chooses the car of a component to move to a spare slot, if any.
+
+        In a chain of m cars, moving the i-th car (from 1) aside lets the
+        cars after it start at once, and it returns to its target slot in
+        round i, so the chain takes max(i, m - i + 1) rounds instead of m.
+        A cycle needs a car aside to start, and more cars aside split it
+        further (see `_count_rounds`).
+
+        Args:
+            is_cycle: Whether the component is a cycle or a chain.
+            component: Its cars (see `_find_components`).
+            cuts: The sorted indices of the cars already moved aside.
+            spare: The spare slot.
+
+        Returns:
+            The index of the car allowed in the spare slot that saves the
+            most rounds, or None if none saves a round.
+        """
+        rounds = self._count_rounds(is_cycle, component, cuts)
+        best_index = None
+        # the first car of a chain moves to its target slot in this round
+        for index in range(0 if is_cycle else 1, len(component)):
+            position = bisect.bisect_left(cuts, index)
+            if position < len(cuts) and cuts[position] == index:
+                continue
+            split_rounds = self._count_rounds(
+                is_cycle, component,
+                cuts[:position] + [index] + cuts[position:])
+            if split_rounds < rounds and \
+                    self._is_allowed(component[index], spare):
+                rounds, best_index = split_rounds, index
+        return best_index
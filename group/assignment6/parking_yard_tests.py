@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+import random
+import unittest
+from parking_lot import ParkingLot
+from parking_yard import ParkingYard
+
+
+class ParkingYardTest(unittest.TestCase):
+    def assertValidRounds(self, start, target, rounds, empty=0,
+                          constraints=None):
+        cars = start.copy()
+        for moves in rounds:
+            empties = {position for position, car in enumerate(cars)
+                       if car == empty}
+            self.assertEqual(len({car for car, _ in moves}), len(moves))
+            self.assertEqual(len({position for _, position in moves}),
+                             len(moves))
+            for car, position in moves:
+                self.assertIn(position, empties)
+                if constraints is not None and position in constraints:
+                    self.assertIn(car, constraints[position])
+            sources = [cars.index(car) for car, _ in moves]
+            for source in sources:
+                cars[source] = empty
+            for car, position in moves:
+                cars[position] = car
+        self.assertListEqual(cars, target)
+
+    def test_invalid_input(self):
+        self.assertRaises(TypeError, ParkingYard, (1, 0))
+        self.assertRaisesRegex(ValueError, "empty slot", ParkingYard, [1, 2])
+        self.assertRaisesRegex(ValueError, "duplicate", ParkingYard,
+                               [1, 1, 0, 0])
+        yard = ParkingYard([1, 2, 0, 0], 0, {0: {1}})
+        self.assertRaises(ValueError, yard.get_rounds, [1, 2, 0])
+        self.assertRaises(ValueError, yard.get_rounds, [1, 3, 0, 0])
+        self.assertRaises(ValueError, yard.get_rounds, [1, 2, 2, 0])
+        self.assertRaises(ValueError, yard.get_rounds, [2, 1, 0, 0])
+        self.assertRaises(ValueError, ParkingYard, [1, 0, 0], 0, {3: {1}})
+
+    def test_single_empty_slot_as_parking_lot(self):
+        random.seed(5)
+        for size in range(1, 20):
+            start = list(range(size))
+            target = start.copy()
+            random.shuffle(target)
+            rounds = ParkingYard(start.copy()).get_rounds(target)
+            self.assertValidRounds(start, target, rounds)
+            self.assertEqual(len(rounds),
+                             len(ParkingLot(start.copy()).get_moves(target)))
+
+    def test_cycles_in_parallel(self):
+        start = [1, 2, 3, 0, 4, 5, 6, 0]
+        target = [3, 1, 2, 0, 6, 4, 5, 0]
+        yard = ParkingYard(start.copy())
+        rounds = yard.get_rounds(target)
+        self.assertValidRounds(start, target, rounds)
+        self.assertEqual(len(rounds), 4)
+        self.assertEqual(sum(map(len, rounds)), 8)
+        self.assertListEqual(yard.cars, target)
+
+    def test_chain_split(self):
+        start = [0, 1, 2, 3, 4, 5, 6, 0]
+        target = [1, 2, 3, 4, 5, 6, 0, 0]
+        yard = ParkingYard(start.copy())
+        rounds = yard.get_rounds(target, retain_state=True)
+        self.assertValidRounds(start, target, rounds)
+        self.assertEqual(len(rounds), 4)
+        self.assertListEqual(yard.cars, start)
+        self.assertListEqual(yard.get_moves(target),
+                             [move for moves in rounds for move in moves])
+
+    def test_spares_split_a_cycle(self):
+        for start, target, expected_rounds in (
+                ([2, 1, 0, 0], [1, 2, 0, 0], 2),
+                ([1, 2, 3, 4, 5, 6, 0, 0, 0], [6, 1, 2, 3, 4, 5, 0, 0, 0], 3)):
+            rounds = ParkingYard(start.copy()).get_rounds(target)
+            self.assertValidRounds(start, target, rounds)
+            self.assertEqual(len(rounds), expected_rounds)
+
+    def test_random_yards(self):
+        random.seed(7)
+        for _ in range(100):
+            size = random.randint(2, 40)
+            empty_count = random.randint(1, size // 2)
+            start = list(range(1, size - empty_count + 1)) + [0] * empty_count
+            random.shuffle(start)
+            target = start.copy()
+            random.shuffle(target)
+            rounds = ParkingYard(start.copy()).get_rounds(target)
+            self.assertValidRounds(start, target, rounds)
+            self.assertGreaterEqual(
+                len(rounds) * empty_count,
+                sum(car != end_car and car != 0
+                    for car, end_car in zip(start, target)))
+
+    def test_constraints(self):
+        start = ["a", "b", "c", "", ""]
+        target = ["c", "a", "b", "", ""]
+        constraints = {3: {"b"}, 4: set()}
+        rounds = ParkingYard(start.copy(), "", constraints).get_rounds(target)
+        self.assertValidRounds(start, target, rounds, "", constraints)
+        self.assertIn(("b", 3), rounds[0])
+        stuck = ParkingYard(start.copy(), "", {3: set(), 4: set()})
+        self.assertIsNone(stuck.get_rounds(target))
+        self.assertListEqual(stuck.cars, start)
+
+
+if __name__ == "__main__":
+    unittest.main()